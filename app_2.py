@@ -1,7 +1,14 @@
 import streamlit as st
+from dotenv import load_dotenv
+
+# .env antes de importar os serviços: eles leem suas configurações no import
+load_dotenv()
 
 from auth.login import tela_login
-from pages.consulta import pagina_consulta
+from services.instrumentacao import iniciar_rerun, mostrar_painel
+
+# pages.consulta (pandas, xlsxwriter) e o cliente do Supabase são importados só depois
+# do login, nos ramos que os usam: a tela de login abre só com o Streamlit
 
 # ---------------- SESSION ----------------
 
@@ -14,6 +21,8 @@ if "token" not in st.session_state:
 if "refresh_token" not in st.session_state:
     st.session_state.refresh_token = None
 
+iniciar_rerun()
+
 
 # ---------------- CONFIG ----------------
 
@@ -43,17 +52,30 @@ with st.sidebar:
     st.divider()
     if st.session_state.user:
         st.caption(f"✅ Logado como: {st.session_state.user.email}")
+    st.toggle("⏱️ Painel de desempenho", key="painel_desempenho")
 
 # ---------------- ROUTER ----------------
 
 if menu == "Consulta":
 
+    from pages.consulta import pagina_consulta
+
     pagina_consulta()
 
 elif menu == "Sair":
 
+    from services.supabase_client import encerrar_sessao_auth
+
+    encerrar_sessao_auth()
+
     st.session_state.user = None
     st.session_state.token = None
     st.session_state.refresh_token = None
+    st.session_state.pop("_consulta", None)
+
+    st.rerun()
+
+# ---------------- DESEMPENHO ----------------
 
-    st.rerun()
\ No newline at end of file
+if st.session_state.get("painel_desempenho"):
+    mostrar_painel()
@@ -1,5 +1,4 @@
 import streamlit as st
-from services.supabase_client import get_supabase
 
 def tela_login():
     st.title("🔐 Login")
@@ -9,15 +8,18 @@ def tela_login():
 
     if st.button("Entrar"):
         try:
-            supabase = get_supabase()
+            # Import só no clique: a tela de login abre sem carregar o cliente do Supabase
+            from services.supabase_client import iniciar_sessao_auth, novo_cliente_login
+
+            supabase = novo_cliente_login()
             res = supabase.auth.sign_in_with_password({
                 "email": email,
                 "password": senha
             })
 
             st.session_state.user = res.user
-            st.session_state.token = res.session.access_token
-            st.session_state.refresh_token = res.session.refresh_token
+            # Tokens na sessão, renovados em segundo plano antes de vencer
+            iniciar_sessao_auth(res.session)
 
             st.success("Login realizado!")
             st.rerun()
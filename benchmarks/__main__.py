@@ -0,0 +1,5 @@
+import sys
+
+from benchmarks.cenarios import main
+
+sys.exit(main())
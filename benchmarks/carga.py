@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import statistics
+import subprocess
+from collections import defaultdict
+
+from benchmarks.cenarios import _percentil
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.supabase_fake import SupabaseFake
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de memória
+    resource = None
+
+#-------------------- CARGA (sessões concorrentes)
+#
+# Simula N sessões do Streamlit numa mesma instância da aplicação: cada sessão roda
+# app.py pelo AppTest (numa thread) e faz login -> escolhe órgão -> Consultar -> download,
+# contra o SupabaseFake com latência. O fake entra no lugar da rede (transporte httpx): pool
+# de clientes, coalescência, postgrest e decodificação das respostas são os da aplicação.
+# Cada nível de concorrência roda num processo novo, então caches, pool de clientes e pico
+# de memória começam do zero.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = os.path.join(RAIZ, "app.py")
+
+ETAPAS = ["abrir", "login", "selecionar", "consultar", "download", "fluxo"]
+
+URL_FAKE = "http://supabase.fake"
+
+def _instalar_fake(fake: SupabaseFake):
+    # Todos os clientes do processo (módulos compartilhados com o AppTest) falam HTTP com o fake
+    from services import supabase_client
+    supabase_client._config = (URL_FAKE, "anon-fake")
+    supabase_client._http_client = supabase_client.novo_http_client(fake.transporte())
+
+def _runtime_compartilhado():
+    # O AppTest troca Runtime._instance por um mock a cada run e o zera no fim: com várias
+    # sessões em threads, a primeira que termina deixaria as outras sem runtime no meio do
+    # script. Aqui o último runtime visto continua valendo enquanto outro run está em curso.
+    from streamlit.runtime.runtime import Runtime
+
+    original = Runtime.instance.__func__
+    ultimo = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            ultimo[:] = [cls._instance]
+            return cls._instance
+        return ultimo[0] if ultimo else original(cls)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(ultimo))
+
+    # Mesmo problema com a opção global.appTest, ligada e restaurada em volta de cada run:
+    # fica ligada de vez
+    import contextlib
+    from streamlit import config
+    from streamlit.testing.v1 import app_test
+
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda opcoes: contextlib.nullcontext()
+
+    # E com PagesManager.uses_pages_directory, que o AppTest zera antes de cada run: lido por
+    # outra sessão nesse intervalo, o script roda sem o modo pages/ e os widgets mudam de id
+    # (a seleção volta ao default). O valor fica fixo e o AppTest zera o de uma subclasse.
+    from streamlit.runtime.pages_manager import PagesManager
+
+    PagesManager.uses_pages_directory = os.path.isdir(os.path.join(RAIZ, "pages"))
+    app_test.PagesManager = type("PagesManagerCarga", (PagesManager,), {})
+
+    # O AppTest compila o script a cada run; compilar em várias threads ao mesmo tempo quebra
+    # o compilador do Python 3.11 ("AST constructor recursion depth mismatch"). Um ScriptCache
+    # só, como o servidor do Streamlit usa para todas as sessões.
+    cache_scripts = app_test.ScriptCache()
+    app_test.ScriptCache = lambda: cache_scripts
+
+def _sessao(indice: int, orgaos: list, iteracoes: int, formato: str, mesmo_usuario: bool,
+            tempos: dict, erros: list, largada: threading.Barrier):
+    from streamlit.testing.v1 import AppTest
+    from services.exportacao import exportar
+
+    rnd = random.Random(indice)
+
+    def etapa(nome: str, func):
+        inicio = time.perf_counter()
+        func()
+        tempos[nome].append(time.perf_counter() - inicio)
+        if at.exception:
+            raise RuntimeError(f"{nome}: {at.exception[0].value}")
+
+    def baixar(orgao: str):
+        # O que o servidor faz no clique do download_button (os dados são gerados sob demanda)
+        consulta = at.session_state["_consulta"]
+        versao = consulta["por_orgao"][orgao]["versao"]
+        exportar(formato, consulta["chave"][2], orgao, versao, consulta["tabelas"][orgao], consulta["outros"][orgao])
+
+    at = AppTest.from_file(APP, default_timeout=600)
+    try:
+        largada.wait()
+        etapa("abrir", at.run)
+
+        at.text_input[0].input("carga@teste.local" if mesmo_usuario else f"sessao{indice}@teste.local")
+        at.text_input[1].input("senha")
+        etapa("login", lambda: at.button[0].click().run())
+
+        for _ in range(iteracoes):
+            orgao = rnd.choice(orgaos)
+            inicio = time.perf_counter()
+            etapa("selecionar", lambda: at.multiselect(key="orgao_sel_top").set_value([orgao]).run())
+            consultar = next(b for b in at.button if b.label == "🔎 Consultar")
+            etapa("consultar", lambda: consultar.click().run())
+            etapa("download", lambda: baixar(orgao))
+            tempos["fluxo"].append(time.perf_counter() - inicio)
+    except Exception as ex:
+        erros.append(f"sessão {indice}: {ex!r}")
+
+def _pico_memoria_mb():
+    if resource is None:
+        return None
+    # ru_maxrss: KB no Linux, bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (2**20 if sys.platform == "darwin" else 2**10)
+
+def _resumo(tempos: list) -> dict:
+    if not tempos:
+        return {"n": 0}
+    return {
+        "n": len(tempos),
+        "p50_s": _percentil(tempos, 0.50),
+        "p95_s": _percentil(tempos, 0.95),
+        "p99_s": _percentil(tempos, 0.99),
+        "max_s": max(tempos),
+        "media_s": statistics.fmean(tempos),
+    }
+
+def executar_nivel(sessoes: int, iteracoes: int, latencia: float, n_orgaos: int, n_membros: int,
+                   anos, linhas_por_orgao_mes: int, max_rows: int, formato: str,
+                   mesmo_usuario: bool, seed: int, validade_token: int = 3600) -> dict:
+    """Um nível de concorrência neste processo: `sessoes` sessões ao mesmo tempo"""
+    df = gerar_movimentacao(n_orgaos, n_membros, anos, linhas_por_orgao_mes, seed=seed)
+    fake = SupabaseFake(df, latencia=latencia, max_rows=max_rows, validade_token=validade_token)
+    _instalar_fake(fake)
+    _runtime_compartilhado()
+    orgaos = sorted(df["orgao"].unique())
+    memoria_inicial = _pico_memoria_mb()
+
+    tempos = defaultdict(list)
+    erros = []
+    largada = threading.Barrier(sessoes)
+    threads = [
+        threading.Thread(
+            target=_sessao,
+            args=(i, orgaos, iteracoes, formato, mesmo_usuario, tempos, erros, largada),
+            name=f"sessao-{i}",
+        )
+        for i in range(sessoes)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "sessoes": sessoes,
+        "duracao_s": duracao,
+        "fluxos": len(tempos["fluxo"]),
+        "vazao_fluxos_s": len(tempos["fluxo"]) / duracao if duracao else None,
+        "requisicoes": fake.requisicoes,
+        "renovacoes_token": fake.auth.renovacoes,
+        "erros": erros,
+        "memoria_inicial_mb": memoria_inicial,
+        "memoria_pico_mb": _pico_memoria_mb(),
+        "etapas": {nome: _resumo(tempos[nome]) for nome in ETAPAS},
+    }
+
+def _nivel_em_processo(sessoes: int, args) -> dict:
+    comando = [
+        sys.executable, "-m", "benchmarks.carga", "--nivel", str(sessoes),
+        "--iteracoes", str(args.iteracoes), "--latencia", str(args.latencia),
+        "--orgaos", str(args.orgaos), "--membros", str(args.membros),
+        "--anos", *map(str, args.anos), "--linhas-por-orgao-mes", str(args.linhas_por_orgao_mes),
+        "--max-rows", str(args.max_rows), "--formato", args.formato, "--seed", str(args.seed),
+        "--validade-token", str(args.validade_token),
+    ]
+    if args.mesmo_usuario:
+        comando.append("--mesmo-usuario")
+    saida = subprocess.run(comando, cwd=RAIZ, capture_output=True, text=True)
+    if saida.returncode != 0:
+        raise RuntimeError(f"Nível {sessoes} falhou:\n{saida.stderr[-2000:]}")
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def _ms(resumo: dict, chave: str) -> str:
+    return f"{resumo[chave] * 1000:9.1f}" if resumo.get("n") else f"{'-':>9s}"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.carga",
+        description="Teste de carga: sessões simultâneas do app (AppTest) contra o Supabase fake",
+    )
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="níveis de concorrência (sessões simultâneas)")
+    parser.add_argument("--iteracoes", type=int, default=3, help="consultas por sessão após o login")
+    parser.add_argument("--latencia", type=float, default=0.05, help="segundos por requisição")
+    parser.add_argument("--orgaos", type=int, default=200)
+    parser.add_argument("--membros", type=int, default=1500)
+    parser.add_argument("--anos", type=int, nargs="+", default=[2023, 2024])
+    parser.add_argument("--linhas-por-orgao-mes", type=int, default=4)
+    parser.add_argument("--max-rows", type=int, default=1000, help="max-rows do PostgREST")
+    parser.add_argument("--formato", choices=["csv", "xlsx"], default="csv", help="arquivo baixado")
+    parser.add_argument("--mesmo-usuario", action="store_true",
+                        help="todas as sessões com o mesmo usuário (compartilham o cache)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--validade-token", type=int, default=3600,
+                        help="segundos de validade do access token (curta = exercita a renovação)")
+    parser.add_argument("--saida", help="arquivo JSON para gravar os resultados")
+    parser.add_argument("--nivel", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.nivel is not None:
+        # Processo filho: roda um nível e imprime o JSON
+        resultado = executar_nivel(
+            args.nivel, args.iteracoes, args.latencia, args.orgaos, args.membros, args.anos,
+            args.linhas_por_orgao_mes, args.max_rows, args.formato, args.mesmo_usuario, args.seed,
+            args.validade_token,
+        )
+        print(json.dumps(resultado))
+        return 0
+
+    print(f"{'sessões':>7s} {'fluxos':>6s} {'fluxos/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+          f"{'consultar p95':>13s} {'pico MB':>8s} {'renov.':>6s} erros")
+    niveis = []
+    for sessoes in args.sessoes:
+        r = _nivel_em_processo(sessoes, args)
+        niveis.append(r)
+        fluxo, consultar = r["etapas"]["fluxo"], r["etapas"]["consultar"]
+        pico = f"{r['memoria_pico_mb']:8.0f}" if r["memoria_pico_mb"] is not None else f"{'-':>8s}"
+        print(f"{sessoes:7d} {r['fluxos']:6d} {r['vazao_fluxos_s']:8.2f} {_ms(fluxo, 'p50_s')} "
+              f"{_ms(fluxo, 'p95_s')} {_ms(fluxo, 'p99_s')} {_ms(consultar, 'p95_s'):>13s} {pico} "
+              f"{r['renovacoes_token']:6d} {len(r['erros'])}")
+        for erro in r["erros"][:3]:
+            print(f"        {erro}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "niveis": niveis}, f, ensure_ascii=False, indent=2)
+    return 1 if any(r["erros"] for r in niveis) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
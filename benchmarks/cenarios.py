@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+# A aplicação exige as variáveis do Supabase no import; aqui elas não são usadas
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalido")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+os.environ.setdefault("INSTRUMENTACAO_LOG", "0")
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.importacao import perfil_login
+from benchmarks.supabase_fake import SupabaseFake
+
+#-------------------- CENÁRIOS
+
+def _percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+def _memoria(func) -> dict:
+    # Pico de alocações Python (tracemalloc não vê buffers do pyarrow) e tamanho do resultado
+    tracemalloc.start()
+    try:
+        resultado = func()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    tamanho = resultado.memory_usage(index=True, deep=True).sum() if hasattr(resultado, "memory_usage") else None
+    return {
+        "pico_python_mb": pico / 2**20,
+        "resultado_mb": float(tamanho) / 2**20 if tamanho is not None else None,
+    }
+
+def medir(func, repeticoes: int, aquecimento: int = 1, fake: SupabaseFake = None,
+          memoria: bool = False) -> dict:
+    for _ in range(aquecimento):
+        func()
+
+    tempos = []
+    requisicoes = 0
+    linhas = None
+    for _ in range(repeticoes):
+        antes = fake.requisicoes if fake else 0
+        inicio = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - inicio)
+        requisicoes += (fake.requisicoes - antes) if fake else 0
+        if hasattr(resultado, "__len__"):
+            linhas = len(resultado)
+
+    resultado = {
+        "repeticoes": repeticoes,
+        "min_s": min(tempos),
+        "mediana_s": statistics.median(tempos),
+        "p95_s": _percentil(tempos, 0.95),
+        "media_s": statistics.fmean(tempos),
+        "linhas": linhas,
+        "requisicoes_por_chamada": requisicoes / repeticoes if fake else None,
+    }
+    if memoria:
+        resultado.update(_memoria(func))
+    return resultado
+
+def executar(n_orgaos: int, n_membros: int, anos, linhas_por_orgao_mes: int,
+             latencia: float, max_rows: int, repeticoes: int, seed: int) -> dict:
+    import pandas as pd
+    from postgrest.types import JSONAdapter
+
+    import pages.consulta as consulta
+    from services.exportacao import gerar_csv_consolidado, gerar_xlsx
+    from services.cache import resultados as cache_resultados
+    from services.movimentacao import buscar_outros_por_orgaos, buscar_por_orgaos, ordenar_por_mes_e_designacao
+    from services.paginacao import buscar_dataframe, ler_csv
+    from services.resumo_mensal import buscar_painel_orgaos, buscar_resumos
+    from utils.analise import analisar_orgao, analisar_resumos
+    from utils.tabela_paginada import TabelaPaginada
+
+    df = gerar_movimentacao(n_orgaos, n_membros, anos, linhas_por_orgao_mes, seed=seed)
+    fake = SupabaseFake(df, latencia=latencia, max_rows=max_rows)
+    consulta.get_supabase = lambda: fake
+
+    # Órgão mais populoso: o pior caso da página
+    orgao = df["orgao"].value_counts().idxmax()
+    df_orgao = consulta.consultar_por_orgao(orgao)
+    df_outros = consulta.consultar_membros_mes_outros_orgaos_pares(df_orgao, orgao)
+    df_desordenado = df.sample(frac=1, random_state=seed)
+    tabela_orgao = TabelaPaginada(df_orgao)
+
+    # Comparação de vários órgãos, sem cache: uma consulta em lote x uma consulta por órgão
+    varios = df["orgao"].value_counts().index[:5].tolist()
+
+    def varios_em_lote():
+        cache_resultados.invalidar()
+        return buscar_outros_por_orgaos(fake, buscar_por_orgaos(fake, "benchmark", varios))
+
+    def varios_um_a_um():
+        cache_resultados.invalidar()
+        for o in varios:
+            consulta.consultar_membros_mes_outros_orgaos_pares(consulta.consultar_por_orgao(o), o)
+        return varios
+
+    # Ingestão: a tabela inteira nos dois formatos de resposta do PostgREST
+    colunas = ", ".join(df.columns)
+    corpo_json = df.to_json(orient="records", force_ascii=False).encode("utf-8")
+    corpo_csv = df.to_csv(index=False)
+
+    cenarios = {
+        "listar_orgaos_unicos": lambda: consulta.listar_orgaos_unicos(),
+        "consultar_por_orgao": lambda: consulta.consultar_por_orgao(orgao),
+        "consultar_membros_mes_outros_orgaos_pares": (
+            lambda: consulta.consultar_membros_mes_outros_orgaos_pares(df_orgao, orgao)
+        ),
+        "consulta_5_orgaos_em_lote": varios_em_lote,
+        "consulta_5_orgaos_um_a_um": varios_um_a_um,
+        "ordenar_por_mes_e_designacao": lambda: ordenar_por_mes_e_designacao(df_desordenado),
+        "analisar_orgao": lambda: analisar_orgao(df_orgao),
+        # Mesmas análises a partir dos resumos por ano (guardados no cache após o aquecimento)
+        "analisar_resumos": lambda: analisar_resumos(buscar_resumos(fake, "benchmark", [orgao])[orgao]),
+        "painel_orgaos": lambda: buscar_painel_orgaos(fake, "benchmark"),
+        # Página visível da Tabela 1 filtrada e ordenada (índices já calculados no aquecimento)
+        "pagina_tabela_orgao": lambda: tabela_orgao.pagina(tabela_orgao.posicoes("auxilio", "membro", False), 1, 100),
+        "exportacao_csv": lambda: gerar_csv_consolidado(df_orgao, df_outros),
+        "exportacao_xlsx": lambda: gerar_xlsx(df_orgao, df_outros),
+        # Só a decodificação do corpo (o que o postgrest faz no JSON x parser C do pandas)
+        "decodificar_json": lambda: pd.DataFrame(JSONAdapter.validate_json(corpo_json)),
+        "decodificar_csv": lambda: ler_csv(corpo_csv, "movimentacao"),
+        # Paginação completa de movimentacao em cada formato
+        "ingestao_json": lambda: buscar_dataframe(fake, "movimentacao", colunas, formato="json"),
+        "ingestao_csv": lambda: buscar_dataframe(fake, "movimentacao", colunas, formato="csv"),
+    }
+    com_memoria = {"decodificar_json", "decodificar_csv", "ingestao_json", "ingestao_csv"}
+
+    resultados = {}
+    for nome, func in cenarios.items():
+        resultados[nome] = r = medir(func, repeticoes, fake=fake, memoria=nome in com_memoria)
+        linha = f"{nome:45s} mediana={r['mediana_s'] * 1000:9.2f} ms p95={r['p95_s'] * 1000:9.2f} ms"
+        if "pico_python_mb" in r:
+            linha += f" pico={r['pico_python_mb']:7.1f} MB resultado={r['resultado_mb']:7.1f} MB"
+        print(linha)
+    return resultados
+
+def medir_login(repeticoes: int) -> dict:
+    """Partidas a frio da tela de login (um processo novo por repetição)"""
+    perfis = [perfil_login() for _ in range(repeticoes)]
+    tempos = [p["script_s"] for p in perfis]
+    resultado = {
+        "repeticoes": repeticoes,
+        "min_s": min(tempos),
+        "mediana_s": statistics.median(tempos),
+        "p95_s": _percentil(tempos, 0.95),
+        "media_s": statistics.fmean(tempos),
+        "linhas": None,
+        "requisicoes_por_chamada": None,
+        "processo_mediana_s": statistics.median(p["processo_s"] for p in perfis),
+        "modulos_pesados": sorted({m for p in perfis for m in p["pesados"]}),
+    }
+    print(f"{'login_partida_fria':45s} mediana={resultado['mediana_s'] * 1000:9.2f} ms "
+          f"processo={resultado['processo_mediana_s'] * 1000:9.2f} ms "
+          f"pesados={resultado['modulos_pesados'] or '-'}")
+    return resultado
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list:
+    """Cenários cuja mediana piorou mais que `tolerancia` (fração) em relação à base"""
+    regressoes = []
+    for nome, r in atual["resultados"].items():
+        b = base["resultados"].get(nome)
+        if not b:
+            continue
+        variacao = r["mediana_s"] / b["mediana_s"] - 1 if b["mediana_s"] else 0.0
+        marca = "REGRESSÃO" if variacao > tolerancia else ""
+        print(f"{nome:45s} {b['mediana_s'] * 1000:9.2f} -> {r['mediana_s'] * 1000:9.2f} ms "
+              f"({variacao:+.1%}) {marca}")
+        if variacao > tolerancia:
+            regressoes.append(nome)
+    return regressoes
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks da consulta com um Supabase fake e dados sintéticos",
+    )
+    parser.add_argument("--orgaos", type=int, default=200)
+    parser.add_argument("--membros", type=int, default=1500)
+    parser.add_argument("--anos", type=int, nargs="+", default=[2023, 2024])
+    parser.add_argument("--linhas-por-orgao-mes", type=int, default=4)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por requisição")
+    parser.add_argument("--max-rows", type=int, default=1000, help="max-rows do PostgREST")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.15,
+                        help="piora máxima aceita na mediana (fração, padrão 0.15)")
+    args = parser.parse_args(argv)
+
+    parametros = {
+        "orgaos": args.orgaos,
+        "membros": args.membros,
+        "anos": args.anos,
+        "linhas_por_orgao_mes": args.linhas_por_orgao_mes,
+        "latencia": args.latencia,
+        "max_rows": args.max_rows,
+        "repeticoes": args.repeticoes,
+        "seed": args.seed,
+    }
+    resultados = executar(
+        args.orgaos, args.membros, args.anos, args.linhas_por_orgao_mes,
+        args.latencia, args.max_rows, args.repeticoes, args.seed,
+    )
+    resultados["login_partida_fria"] = medir_login(min(args.repeticoes, 3))
+    execucao = {
+        "meta": {
+            "data": datetime.now(timezone.utc).isoformat(),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": parametros,
+        },
+        "resultados": resultados,
+    }
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(execucao, f, ensure_ascii=False, indent=2)
+
+    # A tela de login não pode voltar a importar pandas/xlsxwriter/supabase
+    falhou = bool(resultados["login_partida_fria"]["modulos_pesados"])
+    if falhou:
+        print("REGRESSÃO: a tela de login importa "
+              + ", ".join(resultados["login_partida_fria"]["modulos_pesados"]))
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        if base["meta"].get("parametros") != parametros:
+            print("⚠️ Parâmetros diferentes da execução base; a comparação pode não ser válida.")
+        if comparar(execucao, base, args.tolerancia):
+            return 1
+    return 1 if falhou else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
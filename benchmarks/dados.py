@@ -0,0 +1,55 @@
+import random
+
+import pandas as pd
+
+#-------------------- DADOS SINTÉTICOS (movimentacao)
+
+MESES = [
+    "JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO",
+    "JULHO", "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO",
+]
+
+# Peso de cada designação (inclui VAGO, tratado como membro)
+MIX_DESIGNACAO_PADRAO = {
+    "TITULAR": 0.55,
+    "DESIGNAÇÃO": 0.12,
+    "DESIGNAÇÃO TEMPORÁRIA": 0.05,
+    "AUXÍLIO": 0.12,
+    "AUXÍLIO TEMPORÁRIO": 0.06,
+    "VAGO": 0.10,
+}
+
+def gerar_movimentacao(n_orgaos: int = 200, n_membros: int = 1500, anos=(2023, 2024),
+                       linhas_por_orgao_mes: int = 4, mix_designacao: dict = None,
+                       seed: int = 42) -> pd.DataFrame:
+    """Gera linhas no formato de `movimentacao`.
+
+    Cada órgão recebe `linhas_por_orgao_mes` linhas por mês de cada ano; os membros são
+    sorteados de um conjunto de `n_membros`, então o mesmo membro aparece em vários
+    órgãos no mesmo mês (o caso que a Tabela 2 procura).
+    """
+    rnd = random.Random(seed)
+    mix = mix_designacao or MIX_DESIGNACAO_PADRAO
+    designacoes = list(mix)
+    pesos = list(mix.values())
+
+    orgaos = [f"{i:03d}ª PROMOTORIA DE JUSTIÇA DE TESTE" for i in range(1, n_orgaos + 1)]
+    membros = [f"MEMBRO SINTÉTICO {i:05d}" for i in range(1, n_membros + 1)]
+
+    linhas = []
+    for cod, orgao in enumerate(orgaos, start=1):
+        for ano in anos:
+            for mes in MESES:
+                for _ in range(linhas_por_orgao_mes):
+                    designacao = rnd.choices(designacoes, pesos)[0]
+                    vago = designacao == "VAGO"
+                    linhas.append({
+                        "ano": ano,
+                        "mes": mes,
+                        "orgao": orgao,
+                        "cod_orgao": cod,
+                        "membro": "VAGO" if vago else rnd.choice(membros),
+                        "designacao": None if vago else designacao,
+                        "observacao": None if rnd.random() < 0.8 else "OBSERVAÇÃO SINTÉTICA",
+                    })
+    return pd.DataFrame(linhas)
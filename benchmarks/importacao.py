@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+#-------------------- PARTIDA A FRIO (tela de login)
+#
+# Executa app.py num interpretador novo, sem usuário na sessão (só a tela de login), e
+# informa o tempo e quais módulos pesados foram importados. A tela de login não deve
+# carregar nenhum deles (ver imports tardios em app.py e auth/login.py).
+
+MODULOS_PESADOS = ["pandas", "numpy", "pyarrow", "xlsxwriter", "supabase", "pages.consulta"]
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CODIGO = """
+import sys, json, time
+from streamlit.testing.v1 import AppTest
+
+inicio = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+print(json.dumps({{
+    "script_s": time.perf_counter() - inicio,
+    "titulos": [t.value for t in at.title],
+    "excecoes": [str(e.value) for e in at.exception],
+    "pesados": [m for m in {pesados!r} if m in sys.modules],
+}}))
+"""
+
+def perfil_login(app: str = "app.py") -> dict:
+    """Uma partida a frio: tempo do processo e do script, e os módulos pesados importados"""
+    codigo = _CODIGO.format(app=os.path.join(RAIZ, app), pesados=MODULOS_PESADOS)
+    inicio = time.perf_counter()
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+    resultado["processo_s"] = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,323 @@
+import json
+import time
+import base64
+import itertools
+import threading
+import re
+from types import SimpleNamespace
+
+import httpx
+import pandas as pd
+
+#-------------------- SUPABASE FAKE (offline)
+#
+# Responde às chamadas table().select().eq().in_().neq().gte().order().range().csv().execute()
+# e auth.sign_in_with_password() usadas pela aplicação, sobre um DataFrame em memória.
+# Imita o PostgREST no que importa para desempenho: max-rows por resposta, count=exact,
+# latência por requisição e corpo serializado (JSON ou CSV) que o cliente precisa decodificar.
+# SupabaseFake.transporte() responde as mesmas chamadas no nível HTTP (rotas /rest/v1 e
+# /auth/v1/token), para rodar por baixo do cliente real do supabase.
+
+class RespostaFake:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class ConsultaFake:
+    def __init__(self, cliente, df: pd.DataFrame):
+        self._cliente = cliente
+        self._df = df
+        self._colunas = list(df.columns)
+        self._count = None
+        self._mascaras = []
+        self._ordem = []
+        self._range = None
+        self._csv = False
+
+    def select(self, colunas: str = "*", count=None):
+        if colunas.strip() != "*":
+            self._colunas = [c.strip() for c in colunas.split(",") if c.strip()]
+        self._count = count
+        return self
+
+    # Semântica SQL: comparações com NULL nunca são verdadeiras
+    def eq(self, col, valor):
+        self._mascaras.append(lambda df: df[col].notna() & (df[col] == valor))
+        return self
+
+    def neq(self, col, valor):
+        self._mascaras.append(lambda df: df[col].notna() & (df[col] != valor))
+        return self
+
+    def gt(self, col, valor):
+        self._mascaras.append(lambda df: df[col].notna() & (df[col] > valor))
+        return self
+
+    def gte(self, col, valor):
+        self._mascaras.append(lambda df: df[col].notna() & (df[col] >= valor))
+        return self
+
+    def lte(self, col, valor):
+        self._mascaras.append(lambda df: df[col].notna() & (df[col] <= valor))
+        return self
+
+    def in_(self, col, valores):
+        valores = list(valores)
+        self._mascaras.append(lambda df: df[col].isin(valores))
+        return self
+
+    def is_(self, col, valor):
+        # Só "null", que é o que a aplicação usa
+        self._mascaras.append(lambda df: df[col].isna())
+        return self
+
+    def or_(self, filtros: str):
+        # Só as formas usadas pela aplicação: col.in.(a,b), col.gt.v, col.gte.v e col.is.null
+        condicoes = re.findall(r"(\w+)\.(in|gte|gt|is)\.(\([^)]*\)|[^,]+)", filtros)
+
+        def mascara(df):
+            resultado = pd.Series(False, index=df.index)
+            for col, op, valor in condicoes:
+                if op == "is":
+                    resultado |= df[col].isna()
+                elif op == "gte":
+                    resultado |= df[col].notna() & (df[col] >= int(valor))
+                elif op == "gt":
+                    resultado |= df[col].notna() & (df[col] > int(valor))
+                else:
+                    valores = [int(v) if v.lstrip("-").isdigit() else v for v in valor.strip("()").split(",")]
+                    resultado |= df[col].isin(valores)
+            return resultado
+
+        self._mascaras.append(mascara)
+        return self
+
+    def order(self, col, desc=False, nullsfirst=None):
+        # Nulos sempre no fim (nullsfirst só é aceito para compatibilidade de assinatura)
+        self._ordem.append((col, not desc))
+        return self
+
+    def range(self, inicio: int, fim: int):
+        self._range = (inicio, fim)
+        return self
+
+    def limit(self, n: int):
+        self._range = (0, n - 1)
+        return self
+
+    def csv(self):
+        self._csv = True
+        return self
+
+    def _resultado(self) -> tuple:
+        df = self._df
+        for mascara in self._mascaras:
+            df = df[mascara(df)]
+        total = len(df)
+
+        if self._ordem:
+            df = df.sort_values(
+                [c for c, _ in self._ordem],
+                ascending=[a for _, a in self._ordem],
+                kind="mergesort",
+                na_position="last",
+            )
+
+        inicio, fim = self._range if self._range else (0, total - 1)
+        fim = min(fim, inicio + self._cliente.max_rows - 1)
+        df = df.iloc[inicio:fim + 1][self._colunas]
+        return df, total
+
+    def _serializar(self) -> tuple:
+        # (corpo como o PostgREST envia, linhas da página, total)
+        self._cliente._registrar_requisicao()
+        df, total = self._resultado()
+        if self._csv:
+            # Como o PostgREST: cabeçalho com as colunas e NULL como campo vazio
+            return (df.to_csv(index=False) if len(df) else ""), df, total
+        return df.to_json(orient="records", force_ascii=False), df, total
+
+    def execute(self) -> RespostaFake:
+        corpo, _, total = self._serializar()
+        count = total if self._count else None
+        if self._csv:
+            return RespostaFake(corpo, count)
+        # Corpo JSON decodificado como o postgrest faz: lista de dicts com None nos nulos
+        return RespostaFake(json.loads(corpo), count)
+
+    def _valor(self, col, texto: str):
+        # Valores chegam como texto na URL: numéricos só nas colunas numéricas
+        if pd.api.types.is_numeric_dtype(self._df[col]) and texto.lstrip("-").isdigit():
+            return int(texto)
+        return texto
+
+    def aplicar_parametros(self, parametros: httpx.QueryParams):
+        """Aplica os parâmetros da URL do PostgREST (filtros col=op.valor, or, order, offset/limit)"""
+        offset, limit = 0, None
+        for col, valor in parametros.multi_items():
+            if col == "select":
+                continue
+            if col == "order":
+                for item in valor.split(","):
+                    nome, *modificadores = item.split(".")
+                    self.order(nome, desc="desc" in modificadores)
+            elif col == "offset":
+                offset = int(valor)
+            elif col == "limit":
+                limit = int(valor)
+            elif col == "or":
+                self.or_(valor[1:-1])
+            else:
+                op, _, texto = valor.partition(".")
+                if op == "in":
+                    self.in_(col, [self._valor(col, v) for v in _lista_postgrest(texto)])
+                elif op == "is":
+                    self.is_(col, texto)
+                elif op in ("eq", "neq", "gt", "gte", "lte"):
+                    getattr(self, op)(col, self._valor(col, texto))
+                else:
+                    raise ValueError(f"Operador não suportado pelo fake: {op}")
+        if limit is not None:
+            self.range(offset, offset + limit - 1)
+        return self
+
+def _lista_postgrest(texto: str) -> list:
+    # (a,"b,c",d) -> ["a", "b,c", "d"]; aspas só em valores com vírgula, parênteses ou aspas
+    itens, atual, aspas, escape = [], [], False, False
+    for c in texto.strip()[1:-1]:
+        if escape:
+            atual.append(c)
+            escape = False
+        elif c == "\\":
+            escape = True
+        elif c == '"':
+            aspas = not aspas
+        elif c == "," and not aspas:
+            itens.append("".join(atual))
+            atual = []
+        else:
+            atual.append(c)
+    itens.append("".join(atual))
+    return itens
+
+class AuthFake:
+    def __init__(self, cliente, validade: int = 3600):
+        self._cliente = cliente
+        self.validade = validade
+        self.renovacoes = 0
+        self._seq = itertools.count(1)
+        self._refresh_validos = {}  # refresh token -> email (cada um vale uma vez, como no GoTrue)
+
+    def _sessao(self, email: str):
+        # Token no formato JWT (sem assinatura) com sub = email: cada usuário tem o seu escopo de cache
+        n = next(self._seq)
+        claims = json.dumps({"sub": email, "exp": int(time.time()) + self.validade, "n": n}).encode()
+        payload = base64.urlsafe_b64encode(claims).decode().rstrip("=")
+        refresh_token = f"refresh:{email}:{n}"
+        self._refresh_validos[refresh_token] = email
+        return SimpleNamespace(
+            user=SimpleNamespace(email=email),
+            session=SimpleNamespace(access_token=f"fake.{payload}.fake", refresh_token=refresh_token),
+        )
+
+    def corpo_sessao(self, res) -> dict:
+        """Resposta de /auth/v1/token como o GoTrue envia, para a sessão de _sessao"""
+        return {
+            "access_token": res.session.access_token,
+            "refresh_token": res.session.refresh_token,
+            "token_type": "bearer",
+            "expires_in": self.validade,
+            "expires_at": int(time.time()) + self.validade,
+            "user": {
+                "id": res.user.email,
+                "aud": "authenticated",
+                "role": "authenticated",
+                "email": res.user.email,
+                "app_metadata": {},
+                "user_metadata": {},
+                "created_at": "2024-01-01T00:00:00Z",
+            },
+        }
+
+    def sign_in_with_password(self, credenciais: dict):
+        self._cliente._registrar_requisicao()
+        return self._sessao(credenciais["email"])
+
+    def refresh_session(self, refresh_token: str):
+        self._cliente._registrar_requisicao()
+        email = self._refresh_validos.pop(refresh_token, None)
+        if email is None:
+            raise RuntimeError("Invalid Refresh Token: Already Used")
+        self.renovacoes += 1
+        return self._sessao(email)
+
+class SupabaseFake:
+    def __init__(self, movimentacao: pd.DataFrame, latencia: float = 0.0, max_rows: int = 1000,
+                 validade_token: int = 3600):
+        self.latencia = latencia
+        self.max_rows = max_rows
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+        self.auth = AuthFake(self, validade_token)
+        self._tabelas = {
+            "movimentacao": movimentacao.reset_index(drop=True),
+            "orgaos_distintos": (
+                movimentacao[["orgao"]].drop_duplicates().sort_values("orgao").reset_index(drop=True)
+            ),
+        }
+
+    def _registrar_requisicao(self):
+        with self._lock:
+            self.requisicoes += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def table(self, nome: str) -> ConsultaFake:
+        return ConsultaFake(self, self._tabelas[nome])
+
+    def transporte(self) -> httpx.MockTransport:
+        """Transporte httpx que responde como o Supabase sobre estes dados (ver _responder)"""
+        return httpx.MockTransport(self._responder)
+
+    def _responder(self, request: httpx.Request) -> httpx.Response:
+        caminho = request.url.path.strip("/").split("/")
+        if caminho == ["auth", "v1", "token"]:
+            return self._responder_auth(request)
+        if caminho[:2] == ["rest", "v1"] and len(caminho) == 3 and caminho[2] in self._tabelas:
+            return self._responder_rest(caminho[2], request)
+        return httpx.Response(404, json={"message": f"Rota desconhecida: {request.url.path}"})
+
+    def _responder_auth(self, request: httpx.Request) -> httpx.Response:
+        corpo = json.loads(request.content or b"{}")
+        tipo = request.url.params.get("grant_type")
+        try:
+            if tipo == "password":
+                res = self.auth.sign_in_with_password(corpo)
+            elif tipo == "refresh_token":
+                res = self.auth.refresh_session(corpo.get("refresh_token"))
+            else:
+                return httpx.Response(400, json={"error": "unsupported_grant_type"})
+        except RuntimeError as ex:
+            return httpx.Response(400, json={"error": "invalid_grant", "error_description": str(ex)})
+        return httpx.Response(200, json=self.auth.corpo_sessao(res))
+
+    def _responder_rest(self, tabela: str, request: httpx.Request) -> httpx.Response:
+        if request.method not in ("GET", "HEAD"):
+            return httpx.Response(405, json={"message": "O fake só responde leituras"})
+        count = "exact" if "count=exact" in request.headers.get("prefer", "") else None
+        consulta = self.table(tabela).select(request.url.params.get("select", "*"), count=count)
+        if "text/csv" in request.headers.get("accept", ""):
+            consulta.csv()
+        try:
+            consulta.aplicar_parametros(request.url.params)
+        except (KeyError, ValueError) as ex:
+            return httpx.Response(400, json={"message": str(ex)})
+
+        corpo, df, total = consulta._serializar()
+        inicio = consulta._range[0] if consulta._range else 0
+        faixa = f"{inicio}-{inicio + len(df) - 1}" if len(df) else "*"
+        headers = {
+            "content-type": "text/csv; charset=utf-8" if consulta._csv else "application/json; charset=utf-8",
+            "content-range": f"{faixa}/{total if count else '*'}",
+        }
+        return httpx.Response(200, headers=headers, content=corpo.encode("utf-8"))
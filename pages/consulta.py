@@ -1,70 +1,32 @@
-import io
+import os
+
 import pandas as pd
 import streamlit as st
-from services.supabase_client import get_supabase
-from utils.helpers import is_vago, normalize_str
-import xlsxwriter
-
-# -------------------- ORDENAMENTO
-
-MESES_MAP = {
-    "JANEIRO": 1, "FEVEREIRO": 2, "MARÇO": 3, "ABRIL": 4,
-    "MAIO": 5, "JUNHO": 6, "JULHO": 7, "AGOSTO": 8,
-    "SETEMBRO": 9, "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12
-}
-
-DESIGNACAO_MAP = {
-    "TITULAR": 1,
-    "DESIGNAÇÃO": 2,
-    "DESIGNAÇÃO TEMPORÁRIA": 3,
-    "AUXÍLIO": 4,
-    "AUXÍLIO TEMPORÁRIO": 5,
-}
-
-def ordenar_por_mes_e_designacao(df: pd.DataFrame) -> pd.DataFrame:
-    if df.empty:
-        return df
-
-    df = df.copy()
-
-    if "mes" in df.columns:
-        df["__mes_ord__"] = df["mes"].map(MESES_MAP).fillna(999)
-
-    if "designacao" in df.columns:
-        df["__des_ord__"] = df["designacao"].map(DESIGNACAO_MAP).fillna(999)
-
-    sort_cols = []
-    ascending = []
-
-    if "__mes_ord__" in df.columns:
-        sort_cols.append("__mes_ord__"); ascending.append(True)
-
-    if "__des_ord__" in df.columns:
-        sort_cols.append("__des_ord__"); ascending.append(True)
-
-    if "membro" in df.columns:
-        sort_cols.append("membro"); ascending.append(True)
-
-    if "orgao" in df.columns:
-        sort_cols.append("orgao"); ascending.append(True)
-
-    if sort_cols:
-        df = df.sort_values(by=sort_cols, ascending=ascending, kind="mergesort")
-
-    for c in ["__mes_ord__", "__des_ord__"]:
-        if c in df.columns:
-            df.drop(columns=c, inplace=True)
-
-    return df
+from services.supabase_client import escopo_acesso, get_supabase
+from services.exportacao import exportar, versao_dados
+from services.instrumentacao import instrumentado, medir
+from services.movimentacao import (
+    buscar_anos, buscar_orgaos, buscar_outros_orgaos, buscar_outros_por_orgaos, buscar_por_orgao, buscar_por_orgaos,
+)
+from services.prefetch import Prefetch
+from services.resumo_mensal import resumos_da_tabela
+from utils.analise import analisar_orgao, analisar_resumos
+from utils.tabela_paginada import LINHAS_POR_PAGINA, TabelaPaginada, mostrar_tabela_paginada
+
+# -------------------- CONSULTAS (interface)
+#
+# As consultas ficam em services/movimentacao.py; aqui só o cliente/escopo da sessão
+# e as mensagens de erro na tela.
+
+# Máximo de órgãos comparados numa consulta (todos vão na mesma lista in_)
+CONSULTA_MAX_ORGAOS = int(os.getenv("CONSULTA_MAX_ORGAOS", "10"))
 
 def mostrar_erro(ex: Exception, contexto: str = ""):
     st.error(f"❌ Ocorreu um erro {('em ' + contexto) if contexto else ''}: {ex}")
 
 def listar_orgaos_unicos():
     try:
-        supabase = get_supabase()
-        res = supabase.table("orgaos_distintos").select("orgao").order("orgao").execute()
-        dados = [r["orgao"] for r in res.data or []]
+        dados = buscar_orgaos(get_supabase(), escopo_acesso())
         if not dados:
             st.warning("⚠️ Nenhum órgão encontrado na tabela 'orgaos_distintos'")
         return dados
@@ -72,106 +34,200 @@ def listar_orgaos_unicos():
         mostrar_erro(e, "ao listar órgãos")
         return []
 
-def consultar_por_orgao(orgao: str) -> pd.DataFrame:
+def listar_anos():
     try:
-        supabase = get_supabase()
-        q = (
-            supabase
-            .table("movimentacao")
-            .select("ano, mes, membro, designacao, observacao")
-            .eq("orgao", orgao)
-            .order("mes")
-            .order("membro")
-        )
-
-        res = q.execute()
-        df = pd.DataFrame(res.data or [])
-
-        if df.empty:
-            return df
-
-        df = ordenar_por_mes_e_designacao(df)
-        return df
+        return buscar_anos(get_supabase(), escopo_acesso())
+    except Exception as e:
+        mostrar_erro(e, "ao listar anos")
+        return []
 
+def consultar_por_orgao(orgao: str, anos=None, ao_receber_pagina=None) -> pd.DataFrame:
+    try:
+        return buscar_por_orgao(get_supabase(), escopo_acesso(), orgao, anos, ao_receber_pagina)
     except Exception as ex:
         mostrar_erro(ex, "na consulta por órgão")
         return pd.DataFrame([])
 
-def consultar_membros_mes_outros_orgaos_pares(df_orgao: pd.DataFrame, orgao_sel: str) -> pd.DataFrame:
-    supabase = get_supabase()
-    #Usa os membros e meses da Tabela 1 e busca todas as ocorrências em outros órgãos, mas só retorna registros que casem exatamente o PAR (membro, mes) da Tabela 1. Exclui sempre membro = 'VAGO'.
-
-    if df_orgao.empty or "membro" not in df_orgao.columns or "mes" not in df_orgao.columns:
-        return pd.DataFrame([])
-
-    # Extrai pares (membro, mes) da Tabela 1, excluindo 'VAGO'
-    df_pairs = df_orgao.copy()
-    df_pairs["membro_norm"] = df_pairs["membro"].apply(normalize_str)
-    df_pairs["mes_norm"] = df_pairs["mes"].apply(normalize_str)
-    df_pairs = df_pairs[~df_pairs["membro_norm"].apply(is_vago)]
-
-    membros = sorted(df_pairs["membro_norm"].dropna().unique().tolist())
-    meses = sorted(df_pairs["mes_norm"].dropna().unique().tolist())
+def consultar_por_orgaos(orgaos: list, anos=None, ao_receber_pagina=None) -> dict:
+    try:
+        return buscar_por_orgaos(get_supabase(), escopo_acesso(), orgaos, anos, ao_receber_pagina)
+    except Exception as ex:
+        mostrar_erro(ex, "na consulta por órgão")
+        return {orgao: pd.DataFrame([]) for orgao in orgaos}
 
-    if not membros or not meses:
-        return pd.DataFrame([])
+def consultar_resumos(orgao: str, df_orgao: pd.DataFrame):
+    # Sem os resumos, as análises saem das linhas da Tabela 1 (ver analises_da_consulta)
+    try:
+        return resumos_da_tabela(escopo_acesso(), orgao, df_orgao)
+    except Exception as ex:
+        mostrar_erro(ex, "no resumo mensal")
+        return None
 
-    # Consulta bruta no Supabase (limitada por conjuntos), excluindo o órgão selecionado e 'VAGO'
-    q = (
-        supabase
-        .table("movimentacao")
-        .select("mes, ano, orgao, cod_orgao, membro, designacao, observacao")
-        .in_("membro", membros)
-        .in_("mes", meses)
-        .neq("orgao", orgao_sel)
-        .neq("membro", "VAGO")
-        .order("mes", desc=False)
-        .order("membro", desc=False)
-        .order("orgao", desc=False)
-    )
-    res = q.execute()
-    rows = res.data if hasattr(res, "data") else []
-    df_raw = pd.DataFrame(rows)
+def consultar_membros_mes_outros_orgaos_pares(df_orgao: pd.DataFrame, orgao_sel: str, supabase=None) -> pd.DataFrame:
+    return buscar_outros_orgaos(supabase or get_supabase(), df_orgao, orgao_sel)
 
-    if df_raw.empty:
-        return df_raw
+def consultar_outros_orgaos(tabelas: dict, supabase=None) -> dict:
+    return buscar_outros_por_orgaos(supabase or get_supabase(), tabelas)
 
-    # Normaliza os campos para comparação de pares
-    df_raw["membro_norm"] = df_raw["membro"].apply(normalize_str)
-    df_raw["mes_norm"] = df_raw["mes"].apply(normalize_str)
+# --------------------------- Prefetch
 
-    # Conjunto de pares válidos da Tabela 1
-    pairs_set = set(zip(df_pairs["membro_norm"], df_pairs["mes_norm"]))
+def iniciar_prefetch():
+    # on_change do seletor: começa a buscar Tabela 1 e Tabela 2 antes do clique em Consultar
+    anterior = st.session_state.get("_prefetch")
+    if anterior is not None:
+        anterior.cancelar()
 
-    # Filtra mantendo apenas (membro, mes) que existam na Tabela 1
-    df_outros = df_raw[df_raw.apply(lambda r: (r["membro_norm"], r["mes_norm"]) in pairs_set, axis=1)].copy()
-    
-    # Garante ordem e remove colunas auxiliares
-    cols = [c for c in ["orgao", "cod_orgao", "mes", "ano", "membro", "designacao", "observacao"] if c in df_outros.columns]
-    df_outros = df_outros[cols]
+    orgaos = orgaos_selecionados()
+    if not orgaos:
+        st.session_state["_prefetch"] = None
+        return
 
-    #Ordena pela ordem customizada
-    df_outros = ordenar_por_mes_e_designacao(df_outros)
+    anos = anos_selecionados()
+    supabase = get_supabase()
+    escopo = escopo_acesso()
+    st.session_state["_prefetch"] = Prefetch(
+        (orgaos, anos, escopo),
+        [
+            lambda _, cancelado: buscar_por_orgaos(supabase, escopo, orgaos, anos, cancelado=cancelado),
+            lambda tabelas, cancelado: buscar_outros_por_orgaos(supabase, tabelas, cancelado),
+        ],
+    )
 
-    df_outros.reset_index(drop=True, inplace=True)
-    return df_outros
+def orgaos_selecionados():
+    # Tupla dos órgãos do seletor, na ordem em que foram escolhidos
+    return tuple(st.session_state.get("orgao_sel_top") or ())
+
+def anos_selecionados():
+    # Tupla ordenada dos anos do filtro; None = todos
+    return tuple(sorted(st.session_state.get("anos_sel_top") or ())) or None
+
+def obter_prefetch(orgaos: tuple, anos):
+    prefetch = st.session_state.get("_prefetch")
+    if prefetch is None or prefetch.cancelado or prefetch.chave != (orgaos, anos, escopo_acesso()):
+        return None
+    return prefetch
+
+# --------------------------- Resultados da consulta (session_state)
+#
+# O clique em Consultar grava a chave (orgaos, anos, escopo) em st.session_state["_consulta"].
+# Cada seção da página é um fragmento que calcula só a sua parte na primeira vez e a guarda
+# nesse mesmo dict: interagir com uma seção reexecuta só ela, sem buscar nem recalcular as outras.
+# Tabela 1 e Tabela 2 vêm de uma vez para todos os órgãos da consulta.
+
+def consulta_atual():
+    """Resultados guardados da última consulta (None se ainda não houve consulta)"""
+    consulta = st.session_state.get("_consulta")
+    # Resultados de outro token (novo login na mesma sessão) não são reaproveitados
+    if consulta is not None and consulta["chave"][2] != escopo_acesso():
+        st.session_state["_consulta"] = consulta = None
+    return consulta
+
+def consulta_do_fragmento() -> dict:
+    # Num rerun só do fragmento, a consulta pode ter sido descartada (escopo trocado na
+    # renovação do token): redesenha a página toda, que volta ao seletor
+    consulta = consulta_atual()
+    if consulta is None:
+        st.rerun()
+    return consulta
+
+def iniciar_consulta(orgaos: tuple, anos):
+    # Uma consulta nova descarta os resultados guardados da anterior e volta à primeira página
+    st.session_state["_consulta"] = {"chave": (orgaos, anos, escopo_acesso()), "por_orgao": {}}
+    for chave in [k for k in st.session_state if k.startswith("tabela_") and k.endswith("_pagina")]:
+        del st.session_state[chave]
+
+def tabelas_orgaos(consulta: dict, ao_receber_pagina=None) -> dict:
+    if "tabelas" not in consulta:
+        orgaos, anos, _ = consulta["chave"]
+        # Usa o prefetch iniciado na troca de órgão (se houver); senão consulta agora
+        prefetch = obter_prefetch(orgaos, anos)
+        tabelas = prefetch.resultado(0) if prefetch else None
+        consulta["prefetch"] = tabelas is not None
+        if tabelas is None:
+            tabelas = consultar_por_orgaos(list(orgaos), anos, ao_receber_pagina=ao_receber_pagina)
+        consulta["tabelas"] = tabelas
+    return consulta["tabelas"]
+
+def tabelas_outros(consulta: dict) -> dict:
+    if "outros" not in consulta:
+        orgaos, anos, _ = consulta["chave"]
+        tabelas = tabelas_orgaos(consulta)
+        # O prefetch só vale se a Tabela 1 também veio dele (mesma base de membros/meses)
+        prefetch = obter_prefetch(orgaos, anos) if consulta.get("prefetch") else None
+        outros = prefetch.resultado(1) if prefetch else None
+        if outros is None:
+            outros = consultar_outros_orgaos(tabelas)
+        consulta["outros"] = outros
+    return consulta["outros"]
+
+def dados_orgao(consulta: dict, orgao: str) -> dict:
+    # Análises, versão dos dados e tabelas paginadas de cada órgão da consulta
+    return consulta["por_orgao"].setdefault(orgao, {})
+
+def tabela_paginada(consulta: dict, orgao: str, nome: str, df: pd.DataFrame) -> TabelaPaginada:
+    # Índices de ordenação/filtro guardados junto com os resultados da consulta
+    dados = dados_orgao(consulta, orgao)
+    chave = f"paginada_{nome}"
+    if chave not in dados:
+        dados[chave] = TabelaPaginada(df)
+    return dados[chave]
+
+def previa_por_paginas(placeholder, orgao_sel: str):
+    """Callback de ao_receber_pagina: junta as linhas do órgão até completar a primeira
+    tela (LINHAS_POR_PAGINA) e mostra no placeholder; depois disso ignora as páginas"""
+    previa = []
+
+    def receber(pagina: pd.DataFrame):
+        linhas = sum(len(p) for p in previa)
+        if linhas >= LINHAS_POR_PAGINA:
+            return
+        do_orgao = pagina[pagina["orgao"] == orgao_sel].drop(columns="orgao")
+        if do_orgao.empty:
+            return
+        previa.append(do_orgao.head(LINHAS_POR_PAGINA - linhas))
+        placeholder.dataframe(pd.concat(previa, ignore_index=True), use_container_width=True)
+
+    return receber
+
+def analises_da_consulta(consulta: dict, orgao: str) -> dict:
+    dados = dados_orgao(consulta, orgao)
+    if "analises" not in dados:
+        df = tabelas_orgaos(consulta)[orgao]
+        # Resumos mensais (por ano, no cache) das mesmas partições da Tabela 1 mostrada;
+        # sem eles, uma única passada sobre as linhas dela
+        resumos = consultar_resumos(orgao, df)
+        with medir("analisar_orgao"):
+            if resumos is not None:
+                dados["analises"] = analisar_resumos(resumos)
+            else:
+                dados["analises"] = analisar_orgao(df)
+    return dados["analises"]
 
 # --------------------------- Interface Página
 
-def pagina_consulta():
+@st.fragment
+def secao_seletor():
     orgaos = listar_orgaos_unicos()
-    df_orgao = pd.DataFrame()
 
-    col1, col2 = st.columns([3, 1])
+    col1, col_ano, col2 = st.columns([3, 1, 1])
 
     with col1:
         if not orgaos:
             st.warning("Não há Órgãos cadastrados ou houve erro ao carregar a lista.")
-            orgao_sel = None
         else:
-            orgao_sel = st.selectbox(
-                "Órgão/Promotoria", options=orgaos, index=0, key="orgao_sel_top"
+            st.multiselect(
+                "Órgão/Promotoria", options=orgaos, default=orgaos[:1], key="orgao_sel_top",
+                max_selections=CONSULTA_MAX_ORGAOS, placeholder="Escolha um ou mais órgãos",
+                on_change=iniciar_prefetch,
             )
+        orgaos_sel = orgaos_selecionados() if orgaos else ()
+
+    with col_ano:
+        st.multiselect(
+            "Ano", options=sorted(listar_anos(), reverse=True), key="anos_sel_top",
+            placeholder="Todos os anos", on_change=iniciar_prefetch,
+        )
+        anos_sel = anos_selecionados()
 
     with col2:
         # spacer para alinhar verticalmente o botão com o selectbox
@@ -179,272 +235,211 @@ def pagina_consulta():
         st.write("")  # segunda linha vazia (ajusta a altura)
         consultar = st.button("🔎 Consultar", use_container_width=True)
 
-    if consultar and orgao_sel:
-        # ---- Tabela 1: resultados do órgão selecionado
-        df_orgao = consultar_por_orgao(orgao_sel)
-        st.markdown(
-            f'<h3 style="font-size:1.1rem;margin:0;">Resultado: <strong>{orgao_sel}</strong></h3>',
-            unsafe_allow_html=True,
+    if consultar and orgaos_sel:
+        # Trocar o órgão/ano reexecuta só este fragmento; a consulta redesenha a página toda
+        iniciar_consulta(orgaos_sel, anos_sel)
+        st.rerun()
+
+@st.fragment
+def secao_tabela_orgao(orgao_sel: str, indice: int):
+    # ---- Tabela 1: resultados do órgão selecionado
+    consulta = consulta_do_fragmento()
+    anos_sel = consulta["chave"][1]
+    periodo = f" ({', '.join(map(str, anos_sel))})" if anos_sel else ""
+    st.markdown(
+        f'<h3 style="font-size:1.1rem;margin:0;">Resultado: <strong>{orgao_sel}</strong>{periodo}</h3>',
+        unsafe_allow_html=True,
+    )
+    # Sem prefetch, mostra o início do resultado (linhas deste órgão) enquanto as demais páginas chegam
+    tabela1 = st.empty()
+    df_orgao = tabelas_orgaos(
+        consulta, ao_receber_pagina=previa_por_paginas(tabela1, orgao_sel)
+    )[orgao_sel]
+    if df_orgao.empty:
+        tabela1.info("Nenhum registro encontrado para este Órgão.")
+    else:
+        tabela1.empty()
+        mostrar_tabela_paginada(
+            tabela_paginada(consulta, orgao_sel, "orgao", df_orgao), f"tabela_orgao_{indice}"
         )
-        if df_orgao.empty:
-            st.info("Nenhum registro encontrado para este Órgão.")
-        else:
-            st.dataframe(df_orgao, use_container_width=True)
 
-        # ---- Tabela 2: mesmos membros no(s) mesmo(s) mês(es) em outros órgãos (pareamento exato)
-        st.markdown(
-            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">🔁 Ocorrências em outros Órgãos</h3>',
-            unsafe_allow_html=True,
+@st.fragment
+def secao_tabela_outros(orgao_sel: str, indice: int):
+    # ---- Tabela 2: mesmos membros no(s) mesmo(s) mês(es) em outros órgãos (pareamento exato)
+    consulta = consulta_do_fragmento()
+    st.markdown(
+        '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">🔁 Ocorrências em outros Órgãos</h3>',
+        unsafe_allow_html=True,
+    )
+
+    df_outros = tabelas_outros(consulta)[orgao_sel]
+    if df_outros.empty:
+        st.info("Nenhuma ocorrência em outros Órgãos.")
+    else:
+        mostrar_tabela_paginada(
+            tabela_paginada(consulta, orgao_sel, "outros", df_outros), f"tabela_outros_{indice}"
         )
 
-        df_outros = consultar_membros_mes_outros_orgaos_pares(df_orgao, orgao_sel)
+@st.fragment
+def secao_exportacao(orgao_sel: str):
+    # -------------------- Downloads ÚNICOS
+    consulta = consulta_do_fragmento()
+    st.divider()
+    st.markdown(
+        '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">⬇️ Exportação consolidada</h3>',
+        unsafe_allow_html=True,
+    )
 
-        if df_outros.empty:
-            st.info("Nenhuma ocorrência em outros Órgãos.")
-        else:
-            st.dataframe(df_outros, use_container_width=True)
+    df_orgao = tabelas_orgaos(consulta)[orgao_sel]
+    df_outros = tabelas_outros(consulta)[orgao_sel]
 
-        # -------------------- Downloads ÚNICOS
-        st.divider()
-        st.markdown(
-            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">⬇️ Exportação consolidada</h3>',
-            unsafe_allow_html=True,
-        )
+    # Os arquivos só são gerados quando o botão é clicado (e ficam em cache por escopo de
+    # acesso + órgão + versão dos dados)
+    dados = dados_orgao(consulta, orgao_sel)
+    if "versao" not in dados:
+        dados["versao"] = versao_dados(df_orgao, df_outros)
+    versao = dados["versao"]
+    escopo = consulta["chave"][2]
 
+    col_dl_csv, col_dl_xlsx = st.columns(2)
+    with col_dl_csv:
         # 1) CSV único com as duas tabelas empilhadas e coluna de origem
-        df_orgao_com_tag = df_orgao.copy()
-        df_orgao_com_tag["_tabela"] = "Tabela 1 - Órgão Selecionado"
-
-        df_outros_com_tag = df_outros.copy()
-        df_outros_com_tag["_tabela"] = "Tabela 2 - Outros Órgãos"
-
-        df_consolidado = pd.concat(
-            [df_orgao_com_tag, df_outros_com_tag], ignore_index=True, sort=False
+        st.download_button(
+            label="⬇️ Baixar CSV (Consolidado)",
+            data=lambda: exportar("csv", escopo, orgao_sel, versao, df_orgao, df_outros),
+            file_name=f"consolidado_{orgao_sel}.csv",
+            mime="text/csv",
+            on_click="ignore",
+            use_container_width=True,
+        )
+    with col_dl_xlsx:
+        # 2) Excel único com duas abas (mais organizado para leitura)
+        st.download_button(
+            label="⬇️ Baixar Excel (2 abas)",
+            data=lambda: exportar("xlsx", escopo, orgao_sel, versao, df_orgao, df_outros),
+            file_name=f"consolidado_{orgao_sel}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore",
+            use_container_width=True,
         )
 
-        csv_bytes_all = df_consolidado.to_csv(index=False).encode("utf-8")
+@st.fragment
+def secao_auxilio(orgao_sel: str):
+    # -------------------- Análises de Auxílios
+    consulta = consulta_do_fragmento()
+    st.divider()
+    st.markdown(
+        '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">📊 Análises de Auxílios (Órgão selecionado)</h3>',
+        unsafe_allow_html=True,
+    )
 
-        # 2) Excel único com duas abas (mais organizado para leitura)
-        excel_buffer_all = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer_all, engine="xlsxwriter") as writer:
-            # Se quiser preservar o DataFrame original sem a coluna `_tabela`:
-            df_orgao.to_excel(writer, index=False, sheet_name="Órgão Selecionado")
-            df_outros.to_excel(writer, index=False, sheet_name="Outros Órgãos")
-
-            # Opcional: também incluir a aba consolidada com a coluna `_tabela`
-            # df_consolidado.to_excel(writer, index=False, sheet_name="Consolidado")
-
-        excel_buffer_all.seek(0)
-
-        col_dl_csv, col_dl_xlsx = st.columns(2)
-        with col_dl_csv:
-            st.download_button(
-                label="⬇️ Baixar CSV (Consolidado)",
-                data=csv_bytes_all,
-                file_name=f"consolidado_{orgao_sel}.csv",
-                mime="text/csv",
-                use_container_width=True,
+    auxilio = analises_da_consulta(consulta, orgao_sel)["auxilio"]
+    if not auxilio["registros"]:
+        st.info("Não há registros de auxílio para o Órgão selecionado.")
+    else:
+        # --- Métricas rápidas ---
+        colm1, colm2, colm3 = st.columns(3)
+        with colm1:
+            st.metric("Registros de auxílio", value=f"{auxilio['registros']}")
+        with colm2:
+            st.metric(
+                "Meses com ocorrência de auxílio", value=f"{auxilio['meses']}"
             )
-        with col_dl_xlsx:
-            st.download_button(
-                label="⬇️ Baixar Excel (2 abas)",
-                data=excel_buffer_all.getvalue(),
-                file_name=f"consolidado_{orgao_sel}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True,
+        with colm3:
+            st.metric(
+                "Membros distintos (com auxílio)",
+                value=f"{auxilio['membros']}",
             )
 
-        # -------------------- Análises de Auxílios
-        st.divider()
+        # --- Tabela resumo ---
         st.markdown(
-            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">📊 Análises de Auxílios (Órgão selecionado)</h3>',
+            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">Resumo por mês</h3>',
             unsafe_allow_html=True,
         )
+        st.dataframe(auxilio["por_mes"], use_container_width=True)
+
+@st.fragment
+def secao_designacao(orgao_sel: str):
+    # -------------------- Análise: designacao == 'DESIGNAÇÃO'
+    consulta = consulta_do_fragmento()
+    st.divider()
+    st.markdown(
+        '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">🧾 Ocorrências com Designação</h3>',
+        unsafe_allow_html=True,
+    )
 
-        # Cópia defensiva e filtro por 'auxílio' na designação (case-insensitive, com e sem acento)
-        df_auxilio = df_orgao.copy()
-        if not df_auxilio.empty:
-            df_auxilio["designacao"] = df_auxilio["designacao"].fillna("")
-            mask_aux = df_auxilio["designacao"].str.contains(
-                r"aux[ií]lio", case=False, regex=True
-            )
-            df_auxilio = df_auxilio[mask_aux].copy()
-        else:
-            df_auxilio = pd.DataFrame([])
-
-        if df_auxilio.empty:
-            st.info("Não há registros de auxílio para o Órgão selecionado.")
-        else:
-            # Normaliza 'mes' para 'ano_mes' (AAAA-MM) quando possível; senão, mantém o original
-            # Tenta converter valores comuns (AAAA-MM, AAAA/MM, AAAA-MM-DD, DD/MM/AAAA, etc.)
-            df_auxilio["ano_mes"] = (
-                pd.to_datetime(df_auxilio["mes"], errors="coerce")
-                .dt.to_period("M")
-                .astype(str)
-            )
-            # Se não conseguiu converter (NaT), usa o valor original de 'mes'
-            df_auxilio["ano_mes"] = df_auxilio["ano_mes"].mask(
-                df_auxilio["ano_mes"].isin(["NaT", "nan"]), df_auxilio["mes"]
-            )
-
-            # --- Métricas rápidas ---
-            total_reg_auxilio = len(df_auxilio)
-            meses_com_auxilio = df_auxilio["ano_mes"].nunique()
-            membros_distintos_auxilio = df_auxilio["membro"].nunique()
-
-            colm1, colm2, colm3 = st.columns(3)
-            with colm1:
-                st.metric("Registros de auxílio", value=f"{total_reg_auxilio}")
-            with colm2:
-                st.metric(
-                    "Meses com ocorrência de auxílio", value=f"{meses_com_auxilio}"
-                )
-            with colm3:
-                st.metric(
-                    "Membros distintos (com auxílio)",
-                    value=f"{membros_distintos_auxilio}",
-                )
-
-            # --- Quantidade por mês ---
-            qtd_por_mes = (
-                df_auxilio.groupby("ano_mes", as_index=False)
-                .size()
-                .rename(columns={"size": "quantidade"})
-            )
-
-            # Ordena cronologicamente quando possível
-            qtd_por_mes["ord"] = pd.to_datetime(qtd_por_mes["ano_mes"], errors="coerce")
-            qtd_por_mes = qtd_por_mes.sort_values(
-                ["ord", "ano_mes"], ascending=[True, True]
-            ).drop(columns=["ord"])
-
-            # --- Tabela resumo ---
-            st.markdown(
-                '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">Resumo por mês</h3>',
-                unsafe_allow_html=True,
+    designacao = analises_da_consulta(consulta, orgao_sel)["designacao"]
+    if not designacao["registros"]:
+        st.info("Não há ocorrências com designação igual a 'DESIGNAÇÃO'.")
+    else:
+        # Métricas
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.metric("Registros 'DESIGNAÇÃO'", value=designacao["registros"])
+        with c2:
+            st.metric("Meses com 'DESIGNAÇÃO'", value=designacao["meses"])
+        with c3:
+            st.metric(
+                "Membros distintos (com 'DESIGNAÇÃO')", value=designacao["membros"]
             )
-            st.dataframe(qtd_por_mes, use_container_width=True)
 
-        # -------------------- Análise: designacao == 'DESIGNAÇÃO'
-        st.divider()
+        # --- Tabela resumo ---
         st.markdown(
-            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">🧾 Ocorrências com Designação</h3>',
+            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">Resumo por mês</h3>',
             unsafe_allow_html=True,
         )
+        st.dataframe(designacao["por_mes"], use_container_width=True)
+
+@st.fragment
+def secao_vago(orgao_sel: str):
+    # -------------------- Análise: membro == 'VAGO'
+    consulta = consulta_do_fragmento()
+    st.divider()
+    st.markdown(
+        '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">🚫 Ocorrências com Órgão VAGO</h3>',
+        unsafe_allow_html=True,
+    )
 
-        df_designacao = df_orgao.copy()
-        if not df_designacao.empty:
-            # Comparação exata, ignorando espaços/acento comuns
-            df_designacao["designacao"] = (
-                df_designacao["designacao"].fillna("").str.strip()
-            )
-            df_designacao = df_designacao[
-                df_designacao["designacao"].str.upper() == "DESIGNAÇÃO"
-            ]
-        else:
-            df_designacao = pd.DataFrame([])
-
-        if df_designacao.empty:
-            st.info("Não há ocorrências com designação igual a 'DESIGNAÇÃO'.")
-        else:
-            # Normaliza 'mes' -> 'ano_mes' (AAAA-MM), mantendo original quando não parseável
-            df_designacao["ano_mes"] = (
-                pd.to_datetime(df_designacao["mes"], errors="coerce")
-                .dt.to_period("M")
-                .astype(str)
-            )
-            df_designacao["ano_mes"] = df_designacao["ano_mes"].mask(
-                df_designacao["ano_mes"].isin(["NaT", "nan"]), df_designacao["mes"]
-            )
-
-            # Métricas
-            total_designacao = len(df_designacao)
-            meses_designacao = df_designacao["ano_mes"].nunique()
-            membros_designacao = df_designacao["membro"].nunique()
-
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                st.metric("Registros 'DESIGNAÇÃO'", value=total_designacao)
-            with c2:
-                st.metric("Meses com 'DESIGNAÇÃO'", value=meses_designacao)
-            with c3:
-                st.metric(
-                    "Membros distintos (com 'DESIGNAÇÃO')", value=membros_designacao
-                )
-
-            # Contagem por mês + gráfico compacto
-            qtd_designacao_mes = (
-                df_designacao.groupby("ano_mes", as_index=False)
-                .size()
-                .rename(columns={"size": "quantidade"})
-            )
-            qtd_designacao_mes["ord"] = pd.to_datetime(
-                qtd_designacao_mes["ano_mes"], errors="coerce"
-            )
-            qtd_designacao_mes = qtd_designacao_mes.sort_values(
-                ["ord", "ano_mes"]
-            ).drop(columns=["ord"])
-
-            # --- Tabela resumo ---
-            st.markdown(
-                '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">Resumo por mês</h3>',
-                unsafe_allow_html=True,
-            )
-            st.dataframe(qtd_designacao_mes, use_container_width=True)
-
-        # -------------------- Análise: membro == 'VAGO'
-        st.divider()
+    vago = analises_da_consulta(consulta, orgao_sel)["vago"]
+    if not vago["registros"]:
+        st.info("Não há ocorrências com membro igual a 'VAGO'.")
+    else:
+        # Métricas
+        c1, c2 = st.columns(2)
+        with c1:
+            st.metric("Registros com membro 'VAGO'", value=vago["registros"])
+        with c2:
+            st.metric("Meses com 'VAGO'", value=vago["meses"])
+
+        # --- Tabela resumo ---
         st.markdown(
-            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">🚫 Ocorrências com Órgão VAGO</h3>',
+            '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">Resumo por mês</h3>',
             unsafe_allow_html=True,
         )
+        st.dataframe(vago["por_mes"], use_container_width=True)
 
-        df_vago = df_orgao.copy()
-        if not df_vago.empty:
-            df_vago["membro"] = df_vago["membro"].fillna("").str.strip()
-            df_vago = df_vago[df_vago["membro"].str.upper() == "VAGO"]
-        else:
-            df_vago = pd.DataFrame([])
+def secoes_do_orgao(orgao: str, indice: int):
+    secao_tabela_orgao(orgao, indice)
+    secao_tabela_outros(orgao, indice)
+    secao_exportacao(orgao)
+    secao_auxilio(orgao)
+    secao_designacao(orgao)
+    secao_vago(orgao)
 
-        if df_vago.empty:
-            st.info("Não há ocorrências com membro igual a 'VAGO'.")
-        else:
-            # Normaliza 'mes' -> 'ano_mes'
-            df_vago["ano_mes"] = (
-                pd.to_datetime(df_vago["mes"], errors="coerce")
-                .dt.to_period("M")
-                .astype(str)
-            )
-            df_vago["ano_mes"] = df_vago["ano_mes"].mask(
-                df_vago["ano_mes"].isin(["NaT", "nan"]), df_vago["mes"]
-            )
+@instrumentado("pagina_consulta")
+def pagina_consulta():
+    secao_seletor()
 
-            # Métricas
-            total_vago = len(df_vago)
-            meses_vago = df_vago["ano_mes"].nunique()
-
-            c1, c2 = st.columns(2)
-            with c1:
-                st.metric("Registros com membro 'VAGO'", value=total_vago)
-            with c2:
-                st.metric("Meses com 'VAGO'", value=meses_vago)
-
-            # Contagem por mês + gráfico compacto
-            qtd_vago_mes = (
-                df_vago.groupby("ano_mes", as_index=False)
-                .size()
-                .rename(columns={"size": "quantidade"})
-            )
-            qtd_vago_mes["ord"] = pd.to_datetime(
-                qtd_vago_mes["ano_mes"], errors="coerce"
-            )
-            qtd_vago_mes = qtd_vago_mes.sort_values(["ord", "ano_mes"]).drop(
-                columns=["ord"]
-            )
+    # Os resultados ficam na sessão até a próxima consulta: não dependem do estado do botão
+    if consulta_atual() is None:
+        return
 
-            # --- Tabela resumo ---
-            st.markdown(
-                '<h3 style="font-size:0.95rem;line-height:1.2;margin:0 0 .5rem 0;">Resumo por mês</h3>',
-                unsafe_allow_html=True,
-            )
-            st.dataframe(qtd_vago_mes, use_container_width=True)
\ No newline at end of file
+    orgaos = consulta_atual()["chave"][0]
+    if len(orgaos) == 1:
+        secoes_do_orgao(orgaos[0], 0)
+        return
+
+    # Vários órgãos: uma aba por órgão, com as mesmas seções
+    for indice, (aba, orgao) in enumerate(zip(st.tabs(list(orgaos)), orgaos)):
+        with aba:
+            secoes_do_orgao(orgao, indice)
@@ -0,0 +1,5 @@
+import sys
+
+from relatorios.lote import main
+
+sys.exit(main())
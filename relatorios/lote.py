@@ -0,0 +1,292 @@
+import os
+import re
+import csv
+import sys
+import json
+import time
+import getpass
+import hashlib
+import logging
+import argparse
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+# .env antes dos imports abaixo: os módulos leem suas configurações ao serem importados
+load_dotenv()
+
+# Sem sessão do Streamlit: as linhas JSON da instrumentação só se pedidas explicitamente
+os.environ.setdefault("INSTRUMENTACAO_LOG", "0")
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+from services import espelho, supabase_client
+from services.exportacao import escrever_csv_consolidado, escrever_xlsx
+from services.movimentacao import buscar_orgaos, buscar_outros_orgaos, buscar_por_orgao
+from services.multilotacao import detectar_multilotacao
+from services.resumo_mensal import buscar_painel_orgaos
+
+#-------------------- RELATÓRIO EM LOTE
+#
+# Gera o consolidado (Tabela 1 + Tabela 2) de cada órgão, como o botão de exportação da
+# página, sem Streamlit. Cada órgão concluído vira uma linha em progresso.jsonl; rodar de
+# novo na mesma pasta pula os órgãos já concluídos (retomada) e refaz os que falharam.
+# Com --multilotacao, gera só a visão global de services/multilotacao.py; com --painel,
+# só o painel de todos os órgãos de services/resumo_mensal.py. Com --espelho, é o job que
+# sincroniza o espelho local (services/espelho.py) que a aplicação só lê.
+
+RELATORIO_MAX_WORKERS = int(os.getenv("RELATORIO_MAX_WORKERS", "4"))
+
+ARQUIVO_PROGRESSO = "progresso.jsonl"
+ARQUIVO_INDICE = "indice.csv"
+ARQUIVO_CONFLITOS = "multilotacao_conflitos.csv"
+ARQUIVO_RESUMO = "multilotacao_por_orgao.csv"
+ARQUIVO_PAINEL = "painel_orgaos.csv"
+
+EXTENSOES = {"csv": ".csv", "xlsx": ".xlsx"}
+
+COLUNAS_INDICE = [
+    "orgao", "status", "linhas_tabela_1", "linhas_tabela_2",
+    "arquivo_csv", "arquivo_xlsx", "duracao_s", "gerado_em", "erro",
+]
+
+def nome_arquivo(orgao: str) -> str:
+    """Nome-base do arquivo do órgão: legível e sem colisão (sufixo com hash do nome)"""
+    base = unicodedata.normalize("NFKD", orgao).encode("ascii", "ignore").decode("ascii")
+    base = re.sub(r"[^A-Za-z0-9]+", "_", base).strip("_")[:80] or "orgao"
+    sufixo = hashlib.sha1(orgao.encode("utf-8")).hexdigest()[:8]
+    return f"consolidado_{base}_{sufixo}"
+
+class Progresso:
+    """Registro append-only dos órgãos processados, base da retomada"""
+
+    def __init__(self, pasta: str, reiniciar: bool = False):
+        self.pasta = pasta
+        self.caminho = os.path.join(pasta, ARQUIVO_PROGRESSO)
+        self.registros = {}
+        self._lock = threading.Lock()
+        if reiniciar and os.path.exists(self.caminho):
+            os.remove(self.caminho)
+        if os.path.exists(self.caminho):
+            with open(self.caminho, encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # última linha cortada por uma interrupção
+                    self.registros[registro["orgao"]] = registro
+
+    def concluido(self, orgao: str, formatos, anos=None) -> bool:
+        registro = self.registros.get(orgao)
+        if registro is None or registro["status"] != "ok" or registro.get("anos") != anos:
+            return False
+        arquivos = registro["arquivos"]
+        return all(
+            f in arquivos and os.path.exists(os.path.join(self.pasta, arquivos[f]))
+            for f in formatos
+        )
+
+    def registrar(self, registro: dict):
+        with self._lock:
+            self.registros[registro["orgao"]] = registro
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+def _gravar(caminho: str, formato: str, df_orgao, df_outros):
+    # Grava num arquivo temporário e renomeia: um arquivo final nunca fica pela metade
+    temporario = caminho + ".parcial"
+    if formato == "csv":
+        with open(temporario, "w", encoding="utf-8", newline="") as f:
+            escrever_csv_consolidado(f, df_orgao, df_outros)
+    else:
+        escrever_xlsx(temporario, df_orgao, df_outros)
+    os.replace(temporario, caminho)
+
+def processar_orgao(supabase, escopo: str, orgao: str, pasta: str, formatos, anos=None) -> dict:
+    """Consulta Tabela 1 e Tabela 2 do órgão (nos `anos`, ou todos) e grava um arquivo por formato"""
+    inicio = time.perf_counter()
+    registro = {"orgao": orgao, "status": "ok", "anos": anos, "arquivos": {}}
+    try:
+        df_orgao = buscar_por_orgao(supabase, escopo, orgao, anos)
+        df_outros = buscar_outros_orgaos(supabase, df_orgao, orgao)
+        base = nome_arquivo(orgao)
+        for formato in formatos:
+            nome = base + EXTENSOES[formato]
+            _gravar(os.path.join(pasta, nome), formato, df_orgao, df_outros)
+            registro["arquivos"][formato] = nome
+        registro["linhas_tabela_1"] = len(df_orgao)
+        registro["linhas_tabela_2"] = len(df_outros)
+    except Exception as ex:
+        registro["status"] = "erro"
+        registro["erro"] = f"{type(ex).__name__}: {ex}"
+    registro["duracao_s"] = round(time.perf_counter() - inicio, 3)
+    registro["gerado_em"] = datetime.now(timezone.utc).isoformat()
+    return registro
+
+def escrever_indice(pasta: str, orgaos: list, progresso: Progresso) -> str:
+    """indice.csv com uma linha por órgão (na ordem da lista), inclusive pendentes e falhas"""
+    caminho = os.path.join(pasta, ARQUIVO_INDICE)
+    temporario = caminho + ".parcial"
+    with open(temporario, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_INDICE, extrasaction="ignore")
+        escritor.writeheader()
+        for orgao in orgaos:
+            registro = progresso.registros.get(orgao) or {"orgao": orgao, "status": "pendente"}
+            arquivos = registro.get("arquivos", {})
+            escritor.writerow({
+                **registro,
+                "arquivo_csv": arquivos.get("csv", ""),
+                "arquivo_xlsx": arquivos.get("xlsx", ""),
+            })
+    os.replace(temporario, caminho)
+    return caminho
+
+def gerar_multilotacao(supabase, pasta: str, ano_inicial: int = None, ano_final: int = None) -> int:
+    """Conflitos de multi-lotação de todos os órgãos numa varredura só (dois CSVs)"""
+    resultado = detectar_multilotacao(supabase, ano_inicial, ano_final)
+    for nome, df in [(ARQUIVO_CONFLITOS, resultado["conflitos"]), (ARQUIVO_RESUMO, resultado["por_orgao"])]:
+        caminho = os.path.join(pasta, nome)
+        df.to_csv(caminho + ".parcial", index=False, encoding="utf-8")
+        os.replace(caminho + ".parcial", caminho)
+    print(f"{len(resultado['conflitos'])} ocorrências em conflito, "
+          f"{len(resultado['por_orgao'])} órgãos envolvidos: {pasta}")
+    return 0
+
+def gerar_painel(supabase, escopo: str, pasta: str, anos=None) -> int:
+    """Auxílio, Designação e VAGO de todos os órgãos (registros, meses, membros) num CSV"""
+    painel = buscar_painel_orgaos(supabase, escopo, anos)
+    caminho = os.path.join(pasta, ARQUIVO_PAINEL)
+    painel.to_csv(caminho + ".parcial", index=False, encoding="utf-8")
+    os.replace(caminho + ".parcial", caminho)
+    print(f"Painel de {len(painel)} órgãos: {caminho}")
+    return 0
+
+def sincronizar_espelho(supabase, completo: bool = False, continuo: bool = False) -> int:
+    """Sincroniza o espelho local (ESPELHO_LOCAL_PATH); com `continuo`, de novo a cada
+    ESPELHO_INTERVALO_SYNC segundos, até ser interrompido"""
+    if not espelho.ativo():
+        print("Configure ESPELHO_LOCAL_PATH para usar --espelho.", file=sys.stderr)
+        return 2
+    while True:
+        inicio = time.perf_counter()
+        try:
+            linhas, foi_completa = espelho.sincronizar_agendado(supabase, completo)
+            print(f"Espelho {'completo' if foi_completa else 'incremental'}: {linhas} linhas "
+                  f"regravadas em {time.perf_counter() - inicio:.1f} s")
+        except Exception as ex:
+            if not continuo:
+                raise
+            # No job contínuo, uma falha (ex.: rede) espera a próxima rodada
+            print(f"Falha ao sincronizar o espelho: {type(ex).__name__}: {ex}", file=sys.stderr)
+        if not continuo:
+            return 0
+        completo = False
+        try:
+            time.sleep(espelho.ESPELHO_INTERVALO_SYNC)
+        except KeyboardInterrupt:
+            return 130
+
+def autenticar(email: str):
+    """(cliente, escopo): login com e-mail e senha, ou cliente anônimo sem e-mail.
+
+    O login fica num SessaoAuth, renovado em segundo plano: cada consulta do cliente
+    (cada página, cada órgão) usa o token atual, mesmo em execuções mais longas que ele.
+    """
+    if not email:
+        return supabase_client.get_anon_client(), supabase_client.escopo_token(None)
+    senha = os.getenv("RELATORIO_SENHA") or getpass.getpass(f"Senha de {email}: ")
+    res = supabase_client.novo_cliente_login().auth.sign_in_with_password({
+        "email": email,
+        "password": senha,
+    })
+    supabase_client.registrar_token_verificado(res.session.access_token)
+    sessao = supabase_client.SessaoAuth(res.session.access_token, res.session.refresh_token)
+    return supabase_client.ClienteSessao(sessao), supabase_client.escopo_token(sessao.token())
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m relatorios",
+        description="Exporta o consolidado (CSV/XLSX) de todos os órgãos, com retomada",
+    )
+    parser.add_argument("--saida", default="relatorios_saida", help="pasta dos arquivos e do índice")
+    parser.add_argument("--formatos", nargs="+", choices=sorted(EXTENSOES), default=["csv", "xlsx"])
+    parser.add_argument("--workers", type=int, default=RELATORIO_MAX_WORKERS,
+                        help="órgãos processados ao mesmo tempo")
+    parser.add_argument("--orgaos", nargs="+", help="só estes órgãos (padrão: todos)")
+    parser.add_argument("--anos", nargs="+", type=int, help="só estes anos (padrão: todos)")
+    parser.add_argument("--email", default=os.getenv("RELATORIO_EMAIL"),
+                        help="usuário do login (senha em RELATORIO_SENHA ou pedida no terminal)")
+    parser.add_argument("--refazer", action="store_true",
+                        help="ignora o progresso anterior e processa todos de novo")
+    parser.add_argument("--multilotacao", action="store_true",
+                        help="em vez dos consolidados, gera os conflitos de multi-lotação de todos os órgãos")
+    parser.add_argument("--painel", action="store_true",
+                        help="em vez dos consolidados, gera o painel de Auxílio/Designação/VAGO de todos os órgãos")
+    parser.add_argument("--espelho", action="store_true",
+                        help="em vez dos consolidados, sincroniza o espelho local (use uma conta própria em --email)")
+    parser.add_argument("--completo", action="store_true",
+                        help="só com --espelho: sincronização completa mesmo que não esteja vencida")
+    parser.add_argument("--continuo", action="store_true",
+                        help="só com --espelho: continua sincronizando a cada ESPELHO_INTERVALO_SYNC segundos")
+    parser.add_argument("--ano-inicial", type=int, help="só com --multilotacao")
+    parser.add_argument("--ano-final", type=int, help="só com --multilotacao")
+    args = parser.parse_args(argv)
+
+    try:
+        supabase_client.configuracao()
+    except RuntimeError:
+        print("Configure SUPABASE_URL e SUPABASE_ANON_KEY (ambiente ou .env).", file=sys.stderr)
+        return 2
+
+    supabase, escopo = autenticar(args.email)
+    if args.espelho:
+        return sincronizar_espelho(supabase, args.completo, args.continuo)
+    os.makedirs(args.saida, exist_ok=True)
+    if args.multilotacao:
+        return gerar_multilotacao(supabase, args.saida, args.ano_inicial, args.ano_final)
+    if args.painel:
+        return gerar_painel(supabase, escopo, args.saida, args.anos)
+
+    orgaos = args.orgaos or buscar_orgaos(supabase, escopo)
+    if not orgaos:
+        print("Nenhum órgão encontrado.", file=sys.stderr)
+        return 1
+
+    anos = sorted(set(args.anos)) if args.anos else None
+    progresso = Progresso(args.saida, reiniciar=args.refazer)
+    pendentes = [o for o in orgaos if not progresso.concluido(o, args.formatos, anos)]
+    print(f"{len(orgaos)} órgãos: {len(orgaos) - len(pendentes)} já concluídos, "
+          f"{len(pendentes)} a processar com {args.workers} workers")
+
+    falhas = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="relatorio") as pool:
+            futuros = [
+                pool.submit(processar_orgao, supabase, escopo, orgao, args.saida, args.formatos, anos)
+                for orgao in pendentes
+            ]
+            try:
+                for n, fut in enumerate(as_completed(futuros), start=1):
+                    registro = fut.result()
+                    progresso.registrar(registro)
+                    if registro["status"] == "ok":
+                        situacao = (f"ok ({registro['linhas_tabela_1']} + "
+                                    f"{registro['linhas_tabela_2']} linhas, {registro['duracao_s']} s)")
+                    else:
+                        falhas += 1
+                        situacao = f"ERRO {registro['erro']}"
+                    print(f"[{n}/{len(pendentes)}] {registro['orgao']}: {situacao}")
+            except KeyboardInterrupt:
+                for fut in futuros:
+                    fut.cancel()
+                print("Interrompido: rode de novo com a mesma --saida para retomar.", file=sys.stderr)
+                return 130
+    finally:
+        indice = escrever_indice(args.saida, orgaos, progresso)
+
+    print(f"Índice: {indice}" + (f" ({falhas} órgãos com erro)" if falhas else ""))
+    return 1 if falhas else 0
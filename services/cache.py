@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# -------------------- CACHE COMPARTILHADO DE RESULTADOS
+#
+# Cache do processo (vale para todas as sessões do Streamlit). Toda chave inclui o escopo
+# de acesso de quem consultou (ver supabase_client.escopo_acesso), então linhas filtradas
+# por RLS de um usuário nunca são devolvidas para outro.
+
+CACHE_TTL_SEGUNDOS = int(os.getenv("CACHE_TTL_SEGUNDOS", "600"))
+
+# Limite de memória somado de todos os resultados guardados
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# TTL de dados que não mudam mais (ex.: anos fechados); saem só por LRU ou invalidação
+SEM_EXPIRACAO = float("inf")
+
+def tamanho_em_bytes(valor) -> int:
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(sys.getsizeof(v) for v in valor)
+    return sys.getsizeof(valor)
+
+def particao(tabela: str, parte) -> str:
+    """Nome de uma partição da tabela (ex.: um ano): invalidada sozinha ou junto com a tabela"""
+    return f"{tabela}:{parte}"
+
+class CacheResultados:
+    """LRU limitado por bytes, com TTL por entrada e versão por tabela para invalidação"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl: int = CACHE_TTL_SEGUNDOS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()  # chave -> (valor, tamanho, expira_em, versao)
+        self._versoes = {}           # tabela -> versão
+
+    def _chave(self, escopo: str, tabela: str, chave) -> tuple:
+        return (escopo, tabela, chave)
+
+    def _versao_atual(self, tabela: str):
+        # Partição "tabela:parte" depende da versão da tabela e da sua própria
+        base, separador, _ = tabela.partition(":")
+        if not separador:
+            return self._versoes.get(tabela, 0)
+        return (self._versoes.get(base, 0), self._versoes.get(tabela, 0))
+
+    def _remover(self, chave_completa):
+        _, tamanho, _, _ = self._itens.pop(chave_completa)
+        self.bytes -= tamanho
+
+    def obter(self, escopo: str, tabela: str, chave):
+        """Valor guardado (ou None se ausente, vencido ou de uma versão antiga da tabela)"""
+        chave_completa = self._chave(escopo, tabela, chave)
+        with self._lock:
+            item = self._itens.get(chave_completa)
+            if item is None:
+                return None
+            valor, _, expira_em, versao = item
+            if expira_em <= time.time() or versao != self._versao_atual(tabela):
+                self._remover(chave_completa)
+                return None
+            self._itens.move_to_end(chave_completa)
+
+        # Cópia rasa: quem recebe pode adicionar/remover colunas sem afetar o cache
+        if isinstance(valor, pd.DataFrame):
+            return valor.copy(deep=False)
+        if isinstance(valor, list):
+            return list(valor)
+        return valor
+
+    def versao(self, tabela: str):
+        with self._lock:
+            return self._versao_atual(tabela)
+
+    def guardar(self, escopo: str, tabela: str, chave, valor, ttl: int = None, versao: int = None):
+        """Guarda o valor. Se `versao` (lida antes da consulta) já não for a atual, descarta:
+        a tabela foi invalidada enquanto a consulta estava em andamento."""
+        tamanho = tamanho_em_bytes(valor)
+        if tamanho > self.max_bytes:
+            return
+        chave_completa = self._chave(escopo, tabela, chave)
+        expira_em = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            atual = self._versao_atual(tabela)
+            if versao is not None and versao != atual:
+                return
+            if chave_completa in self._itens:
+                self._remover(chave_completa)
+            self._itens[chave_completa] = (valor, tamanho, expira_em, atual)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                self._remover(next(iter(self._itens)))
+
+    def invalidar(self, tabela: str = None):
+        """Descarta os resultados de uma tabela (com suas partições) ou de uma partição, ou de todas"""
+        with self._lock:
+            if tabela is None:
+                self._itens.clear()
+                self.bytes = 0
+                return
+            self._versoes[tabela] = self._versoes.get(tabela, 0) + 1
+            prefixo = tabela + ":"
+            for chave_completa in [k for k in self._itens if k[1] == tabela or k[1].startswith(prefixo)]:
+                self._remover(chave_completa)
+
+resultados = CacheResultados()
@@ -0,0 +1,87 @@
+import threading
+
+import httpx
+
+# -------------------- COALESCÊNCIA (single-flight)
+#
+# Transporte httpx que junta requisições idênticas em andamento: enquanto uma leitura
+# (GET/HEAD) está no ar, outra igual espera o resultado dela em vez de ir ao servidor.
+# "Igual" = mesmo método, mesma URL (tabela, filtros, ordem, range) e mesmos cabeçalhos,
+# o que inclui Authorization: sessões com tokens diferentes nunca compartilham resposta.
+# A resposta entregue a quem esperou leva extensions["coalescida"] = True (a instrumentação
+# conta essas por etapa, ver registrar_resposta).
+
+METODOS_COALESCIVEIS = ("GET", "HEAD")
+
+class _Voo:
+    __slots__ = ("evento", "resposta", "erro", "seguidores")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resposta = None  # (status, headers, extensions, corpo bruto)
+        self.erro = None
+        self.seguidores = 0
+
+class TransporteCoalescente(httpx.BaseTransport):
+    def __init__(self, transporte: httpx.BaseTransport):
+        self._transporte = transporte
+        self._lock = threading.Lock()
+        self._em_voo = {}
+
+    @staticmethod
+    def _chave(request: httpx.Request) -> tuple:
+        return (
+            request.method,
+            str(request.url),
+            tuple(sorted((k.lower(), v) for k, v in request.headers.multi_items())),
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in METODOS_COALESCIVEIS:
+            return self._transporte.handle_request(request)
+
+        chave = self._chave(request)
+        with self._lock:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = _Voo()
+                self._em_voo[chave] = voo
+            else:
+                voo.seguidores += 1
+
+        if lider:
+            try:
+                resposta = self._transporte.handle_request(request)
+                try:
+                    # Corpo bruto (ainda comprimido): cada chamador decodifica a sua cópia
+                    corpo = b"".join(resposta.stream)
+                finally:
+                    resposta.close()
+                voo.resposta = (resposta.status_code, resposta.headers.raw, resposta.extensions, corpo)
+            except BaseException as ex:
+                voo.erro = ex
+            finally:
+                with self._lock:
+                    del self._em_voo[chave]
+                voo.evento.set()
+        else:
+            voo.evento.wait()
+
+        if voo.erro is not None:
+            raise voo.erro
+
+        status, headers, extensions, corpo = voo.resposta
+        extensions = {k: v for k, v in extensions.items() if k != "network_stream"}
+        if not lider:
+            extensions["coalescida"] = True
+        return httpx.Response(
+            status,
+            headers=headers,
+            stream=httpx.ByteStream(corpo),
+            extensions=extensions,
+            request=request,
+        )
+
+    def close(self):
+        self._transporte.close()
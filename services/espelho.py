@@ -0,0 +1,263 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+import pandas as pd
+
+from services.cache import particao, resultados as cache_resultados
+from services.paginacao import buscar_dataframe
+
+logger = logging.getLogger(__name__)
+
+# -------------------- ESPELHO LOCAL (SQLite)
+#
+# Cópia local opcional de `movimentacao` e `orgaos_distintos`. Só é usada quando
+# ESPELHO_LOCAL_PATH está configurado. A aplicação só lê o espelho: quem o preenche é o
+# job de sincronização (python -m relatorios --espelho), fora das requisições e com a
+# conta própria dele. Todos os usuários leem o que essa conta lê, então só ative o
+# espelho se essas tabelas forem legíveis por todos os usuários autenticados (sem RLS
+# por usuário).
+
+ESPELHO_LOCAL_PATH = os.getenv("ESPELHO_LOCAL_PATH")
+
+# Intervalo (segundos) entre sincronizações incrementais do job contínuo
+ESPELHO_INTERVALO_SYNC = int(os.getenv("ESPELHO_INTERVALO_SYNC", "900"))
+
+# Intervalo (segundos) entre sincronizações completas: o incremental só regrava do último
+# ano em diante, então correções e exclusões em anos anteriores só chegam por elas
+ESPELHO_INTERVALO_SYNC_COMPLETO = int(os.getenv("ESPELHO_INTERVALO_SYNC_COMPLETO", "86400"))
+
+# Espelho sincronizado há mais que isso (job parado) não é usado: as consultas vão ao Supabase
+ESPELHO_MAX_IDADE = int(os.getenv("ESPELHO_MAX_IDADE", str(4 * ESPELHO_INTERVALO_SYNC)))
+
+COLUNAS = ["ano", "mes", "orgao", "cod_orgao", "membro", "designacao", "observacao"]
+
+_lock_escrita = threading.RLock()
+
+# Intervalo (segundos) entre verificações de uma sincronização nova feita pelo job
+ESPELHO_INTERVALO_VERIFICACAO = 5
+
+# Última sincronização cujos dados este processo já considerou no cache
+_lock_visto = threading.Lock()
+_visto = {"sincronizado_em": None, "verificado_em": float("-inf")}
+
+def ativo() -> bool:
+    return bool(ESPELHO_LOCAL_PATH)
+
+def _conectar() -> sqlite3.Connection:
+    con = sqlite3.connect(ESPELHO_LOCAL_PATH, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS movimentacao (
+            ano, mes, orgao, cod_orgao, membro, designacao, observacao
+        );
+        CREATE INDEX IF NOT EXISTS idx_mov_orgao ON movimentacao (orgao);
+        CREATE INDEX IF NOT EXISTS idx_mov_membro_mes ON movimentacao (membro, mes);
+        CREATE INDEX IF NOT EXISTS idx_mov_orgao_ano ON movimentacao (orgao, ano);
+        CREATE INDEX IF NOT EXISTS idx_mov_ano ON movimentacao (ano);
+        CREATE TABLE IF NOT EXISTS orgaos_distintos (orgao PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS meta (chave PRIMARY KEY, valor);
+        """
+    )
+    return con
+
+def _ler_meta(con, chave, padrao=None):
+    row = con.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+    return row[0] if row else padrao
+
+def _anos_regravados(ultimo_ano, df: pd.DataFrame) -> list:
+    anos = {int(ultimo_ano)} | ({int(a) for a in df["ano"].dropna().unique()} if not df.empty else set())
+    return [-1, *range(min(anos), max(anos) + 1)]  # -1: linhas sem ano
+
+def sincronizar(supabase, completo: bool = False) -> int:
+    """Atualiza o espelho e devolve quantas linhas de `movimentacao` foram regravadas.
+
+    Incremental por `ano`: regrava do último ano espelhado em diante (o ano corrente
+    recebe meses novos e correções). `completo=True` refaz tudo (ver sincronizar_agendado).
+    """
+    with _lock_escrita:
+        con = _conectar()
+        try:
+            ultimo_ano = None
+            if not completo:
+                ultimo_ano = con.execute("SELECT MAX(ano) FROM movimentacao").fetchone()[0]
+
+            df = buscar_dataframe(
+                supabase,
+                "movimentacao",
+                ", ".join(COLUNAS),
+                # Linhas sem ano também são regravadas no incremental
+                filtros=(lambda q: q.or_(f"ano.gte.{ultimo_ano},ano.is.null")) if ultimo_ano is not None else None,
+                ordem=["ano", "mes", "orgao", "membro"],
+            )
+            res = supabase.table("orgaos_distintos").select("orgao").order("orgao").execute()
+            orgaos = [(r["orgao"],) for r in res.data or []]
+
+            linhas = [] if df.empty else list(
+                df.reindex(columns=COLUNAS).astype(object)
+                .where(lambda d: d.notna(), None)
+                .itertuples(index=False, name=None)
+            )
+
+            with con:
+                if ultimo_ano is None:
+                    con.execute("DELETE FROM movimentacao")
+                else:
+                    con.execute("DELETE FROM movimentacao WHERE ano >= ? OR ano IS NULL", (ultimo_ano,))
+                con.executemany(
+                    f"INSERT INTO movimentacao ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})",
+                    linhas,
+                )
+                if orgaos:
+                    con.execute("DELETE FROM orgaos_distintos")
+                    con.executemany("INSERT OR IGNORE INTO orgaos_distintos (orgao) VALUES (?)", orgaos)
+                agora = time.time()
+                con.execute(
+                    "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('sincronizado_em', ?)", (agora,)
+                )
+                if ultimo_ano is None:
+                    con.execute(
+                        "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('sincronizado_completo_em', ?)",
+                        (agora,),
+                    )
+                else:
+                    # Anos regravados: os outros processos invalidam só esses (ver _preparar)
+                    con.executemany(
+                        "INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)",
+                        [(f"regravado:{ano}", agora) for ano in _anos_regravados(ultimo_ano, df)],
+                    )
+            # Dados novos no espelho: resultados em cache ficaram velhos. No incremental,
+            # só os anos regravados (os anos fechados continuam válidos no cache)
+            if ultimo_ano is None:
+                cache_resultados.invalidar("movimentacao")
+            else:
+                for ano in _anos_regravados(ultimo_ano, df):
+                    cache_resultados.invalidar(particao("movimentacao", ano))
+                cache_resultados.invalidar(particao("movimentacao", "anos"))
+            cache_resultados.invalidar("orgaos_distintos")
+            return len(linhas)
+        finally:
+            con.close()
+
+def sincronizar_agendado(supabase, completo: bool = False) -> tuple:
+    """Sincronização do job: completa se pedida ou se a última completa tiver mais de
+    ESPELHO_INTERVALO_SYNC_COMPLETO segundos; senão incremental. Devolve (linhas, completa)."""
+    if not completo:
+        con = _conectar()
+        try:
+            completo_em = _ler_meta(con, "sincronizado_completo_em")
+        finally:
+            con.close()
+        completo = completo_em is None or time.time() - float(completo_em) >= ESPELHO_INTERVALO_SYNC_COMPLETO
+    return sincronizar(supabase, completo=completo), completo
+
+def _invalidar_sincronizados(con, sincronizado_em: float):
+    # Resultados em cache que vieram de uma versão anterior do espelho: na completa, tudo;
+    # no incremental, só os anos regravados depois da última sincronização vista
+    with _lock_visto:
+        visto = _visto["sincronizado_em"]
+        if visto == sincronizado_em:
+            return
+        _visto["sincronizado_em"] = sincronizado_em
+    if visto is None:
+        return
+    completo_em = _ler_meta(con, "sincronizado_completo_em")
+    if completo_em is not None and float(completo_em) > visto:
+        cache_resultados.invalidar("movimentacao")
+    else:
+        for (chave,) in con.execute(
+            "SELECT chave FROM meta WHERE chave LIKE 'regravado:%' AND valor > ?", (visto,)
+        ):
+            cache_resultados.invalidar(particao("movimentacao", chave.split(":", 1)[1]))
+        cache_resultados.invalidar(particao("movimentacao", "anos"))
+    cache_resultados.invalidar("orgaos_distintos")
+
+def verificar_sincronizacao():
+    """Invalida no cache o que o job regravou desde a última verificação (no máximo uma
+    a cada ESPELHO_INTERVALO_VERIFICACAO s). Chamada antes das consultas que usam o cache."""
+    if not ativo():
+        return
+    agora = time.monotonic()
+    with _lock_visto:
+        if agora - _visto["verificado_em"] < ESPELHO_INTERVALO_VERIFICACAO:
+            return
+        _visto["verificado_em"] = agora
+    try:
+        con = _conectar()
+        try:
+            sincronizado_em = _ler_meta(con, "sincronizado_em")
+            if sincronizado_em is not None:
+                _invalidar_sincronizados(con, float(sincronizado_em))
+        finally:
+            con.close()
+    except Exception as ex:
+        logger.warning("Espelho local indisponível: %s", ex)
+
+def _preparar(con) -> bool:
+    # Só leitura: o espelho responde se foi sincronizado há menos de ESPELHO_MAX_IDADE
+    sincronizado_em = _ler_meta(con, "sincronizado_em")
+    if sincronizado_em is None or time.time() - float(sincronizado_em) > ESPELHO_MAX_IDADE:
+        return False
+    _invalidar_sincronizados(con, float(sincronizado_em))
+    return True
+
+def _ler(sql: str, params=(), preparo=None):
+    # Devolve None quando o espelho está desligado, vazio, velho ou indisponível (o
+    # chamador usa o caminho ao vivo)
+    if not ativo():
+        return None
+    try:
+        con = _conectar()
+        try:
+            if not _preparar(con):
+                return None
+            if preparo is not None:
+                preparo(con)
+            return pd.read_sql_query(sql, con, params=params)
+        finally:
+            con.close()
+    except Exception as ex:
+        logger.warning("Espelho local indisponível, usando Supabase: %s", ex)
+        return None
+
+def listar_orgaos():
+    df = _ler("SELECT orgao FROM orgaos_distintos ORDER BY orgao")
+    return None if df is None else df["orgao"].tolist()
+
+def listar_anos():
+    df = _ler("SELECT DISTINCT ano FROM movimentacao WHERE ano IS NOT NULL ORDER BY ano")
+    return None if df is None else [int(a) for a in df["ano"]]
+
+def consultar_orgaos(orgaos: list, colunas: list, anos: list, com_ano_nulo: bool = False):
+    nulo = " OR ano IS NULL" if com_ano_nulo else ""
+    return _ler(
+        f"SELECT {', '.join(colunas)} FROM movimentacao WHERE orgao IN ({', '.join('?' * len(orgaos))}) "
+        f"AND (ano IN ({', '.join('?' * len(anos))}){nulo}) "
+        f"ORDER BY mes, membro, {', '.join(c for c in colunas if c not in ('mes', 'membro'))}",
+        (*orgaos, *anos),
+    )
+
+def consultar_pares(df_pares: pd.DataFrame, orgaos_excluidos: list, colunas: list):
+    """Linhas cujo (membro, mes, ano) está em df_pares (colunas membro, mes, ano), sem 'VAGO'
+    e fora de `orgaos_excluidos`"""
+    valores = [
+        (membro, mes, int(ano))
+        for membro, mes, ano in df_pares[["membro", "mes", "ano"]].drop_duplicates().itertuples(index=False, name=None)
+    ]
+
+    def carregar_pares(con):
+        con.execute("CREATE TEMP TABLE pares (membro, mes, ano)")
+        con.executemany("INSERT INTO pares (membro, mes, ano) VALUES (?, ?, ?)", valores)
+
+    fora = f"m.orgao NOT IN ({', '.join('?' * len(orgaos_excluidos))}) AND " if orgaos_excluidos else ""
+    return _ler(
+        f"SELECT {', '.join('m.' + c for c in colunas)} FROM pares p "
+        f"JOIN movimentacao m ON m.membro = p.membro AND m.mes = p.mes AND m.ano = p.ano "
+        f"WHERE {fora}m.membro <> 'VAGO' "
+        f"ORDER BY m.mes, m.membro, m.orgao",
+        tuple(orgaos_excluidos),
+        preparo=carregar_pares,
+    )
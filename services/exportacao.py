@@ -0,0 +1,105 @@
+import io
+import os
+import hashlib
+
+import pandas as pd
+import xlsxwriter
+
+from services.cache import SEM_EXPIRACAO, CacheResultados
+from services.instrumentacao import instrumentado
+
+# -------------------- EXPORTAÇÃO
+
+TAG_TABELA_1 = "Tabela 1 - Órgão Selecionado"
+TAG_TABELA_2 = "Tabela 2 - Outros Órgãos"
+
+ABA_TABELA_1 = "Órgão Selecionado"
+ABA_TABELA_2 = "Outros Órgãos"
+
+# Linhas escritas por vez no CSV
+LINHAS_POR_BLOCO = 5000
+
+# Limite de memória dos arquivos gerados guardados (por escopo + órgão + versão dos dados + formato)
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+# LRU por bytes; sem TTL, porque a chave já inclui a versão dos dados
+_cache = CacheResultados(max_bytes=EXPORT_CACHE_MAX_BYTES, ttl=SEM_EXPIRACAO)
+
+def versao_dados(*dfs: pd.DataFrame) -> str:
+    """sha256 do conteúdo dos DataFrames: colunas, forma e o hash de cada linha, em ordem"""
+    digest = hashlib.sha256()
+    for df in dfs:
+        digest.update(repr((list(df.columns), df.shape)).encode("utf-8"))
+        if not df.empty:
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def colunas_consolidado(df_orgao: pd.DataFrame, df_outros: pd.DataFrame) -> list:
+    # Mesma ordem de colunas que pd.concat([tabela1 + _tabela, tabela2 + _tabela]) produziria
+    cols = list(df_orgao.columns) + ["_tabela"]
+    cols += [c for c in df_outros.columns if c not in cols]
+    return cols
+
+def escrever_csv_consolidado(saida, df_orgao: pd.DataFrame, df_outros: pd.DataFrame):
+    """Escreve o CSV com as duas tabelas empilhadas (coluna `_tabela`), bloco a bloco"""
+    cols = colunas_consolidado(df_orgao, df_outros)
+    cabecalho = True
+    for df, tag in [(df_orgao, TAG_TABELA_1), (df_outros, TAG_TABELA_2)]:
+        for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+            bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].reindex(columns=cols)
+            bloco["_tabela"] = tag
+            bloco.to_csv(saida, index=False, header=cabecalho)
+            cabecalho = False
+    if cabecalho:
+        pd.DataFrame(columns=cols).to_csv(saida, index=False)
+
+def gerar_csv_consolidado(df_orgao: pd.DataFrame, df_outros: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    texto = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+    escrever_csv_consolidado(texto, df_orgao, df_outros)
+    texto.flush()
+    dados = buffer.getvalue()
+    texto.detach()
+    return dados
+
+def _escrever_aba(workbook, nome: str, df: pd.DataFrame, fmt_cabecalho):
+    ws = workbook.add_worksheet(nome)
+    if df.columns.empty:
+        return
+    for j, col in enumerate(df.columns):
+        ws.write(0, j, col, fmt_cabecalho)
+    # constant_memory exige escrita linha a linha, em ordem
+    for i, linha in enumerate(df.itertuples(index=False, name=None), start=1):
+        for j, valor in enumerate(linha):
+            if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+                continue
+            ws.write(i, j, valor)
+
+def escrever_xlsx(saida, df_orgao: pd.DataFrame, df_outros: pd.DataFrame):
+    """Excel com duas abas, em modo constant_memory (as linhas vão para disco, não para RAM)"""
+    workbook = xlsxwriter.Workbook(saida, {"constant_memory": True})
+    try:
+        fmt_cabecalho = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+        _escrever_aba(workbook, ABA_TABELA_1, df_orgao, fmt_cabecalho)
+        _escrever_aba(workbook, ABA_TABELA_2, df_outros, fmt_cabecalho)
+    finally:
+        workbook.close()
+
+def gerar_xlsx(df_orgao: pd.DataFrame, df_outros: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    escrever_xlsx(buffer, df_orgao, df_outros)
+    return buffer.getvalue()
+
+@instrumentado("exportacao")
+def exportar(formato: str, escopo: str, orgao: str, versao: str, df_orgao: pd.DataFrame,
+             df_outros: pd.DataFrame) -> bytes:
+    """Gera (ou reaproveita do cache do `escopo`) o arquivo de exportação: formato 'csv' ou 'xlsx'"""
+    chave = (formato, orgao, versao)
+    dados = _cache.obter(escopo, "exportacao", chave)
+    if dados is not None:
+        return dados
+
+    gerar = gerar_csv_consolidado if formato == "csv" else gerar_xlsx
+    dados = gerar(df_orgao, df_outros)
+    _cache.guardar(escopo, "exportacao", chave, dados)
+    return dados
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# -------------------- INSTRUMENTAÇÃO
+#
+# Mede cada etapa (tempo de parede, linhas, requisições, bytes recebidos e tempo de rede;
+# das requisições, quantas esperaram uma igual em andamento em vez de ir ao servidor) e grava uma linha JSON por etapa no log. As medições do rerun atual também ficam em
+# st.session_state para o painel de desempenho da barra lateral.
+
+logger = logging.getLogger("movimentacao.instrumentacao")
+
+if os.getenv("INSTRUMENTACAO_LOG", "1") == "1" and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_etapa_atual = contextvars.ContextVar("etapa_atual", default=None)
+
+class Medicao:
+    __slots__ = ("etapa", "duracao_ms", "rede_ms", "requisicoes", "coalescidas", "bytes", "linhas", "_lock")
+
+    def __init__(self, etapa: str):
+        self.etapa = etapa
+        self.duracao_ms = 0.0
+        self.rede_ms = 0.0
+        self.requisicoes = 0
+        self.coalescidas = 0
+        self.bytes = 0
+        self.linhas = None
+        self._lock = threading.Lock()
+
+    def como_dict(self) -> dict:
+        return {
+            "etapa": self.etapa,
+            "duracao_ms": round(self.duracao_ms, 2),
+            "rede_ms": round(self.rede_ms, 2),
+            "requisicoes": self.requisicoes,
+            "coalescidas": self.coalescidas,
+            "bytes": self.bytes,
+            "linhas": self.linhas,
+        }
+
+def _sessao_ativa() -> bool:
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+def _registrar(m: Medicao):
+    dados = m.como_dict()
+    if _sessao_ativa():
+        dados["rerun"] = st.session_state.get("_instrumentacao_reruns", 0)
+        st.session_state.setdefault("_instrumentacao_medicoes", []).append(dados)
+    logger.info(json.dumps(dados, ensure_ascii=False))
+
+@contextmanager
+def medir(etapa: str):
+    m = Medicao(etapa)
+    token = _etapa_atual.set(m)
+    inicio = time.perf_counter()
+    try:
+        yield m
+    finally:
+        m.duracao_ms = (time.perf_counter() - inicio) * 1000
+        _etapa_atual.reset(token)
+        _registrar(m)
+
+def contar_linhas(resultado):
+    """len() do resultado; num dict ({orgao: DataFrame}), a soma dos len() dos valores"""
+    if isinstance(resultado, dict):
+        return sum(len(v) for v in resultado.values() if hasattr(v, "__len__"))
+    if hasattr(resultado, "__len__"):
+        return len(resultado)
+    return None
+
+def instrumentado(etapa: str, linhas=contar_linhas):
+    """Decorator: mede a função e usa linhas(resultado) como contagem de linhas"""
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with medir(etapa) as m:
+                resultado = func(*args, **kwargs)
+                m.linhas = linhas(resultado)
+                return resultado
+        return wrapper
+    return decorador
+
+def submeter(pool, func, *args):
+    """pool.submit propagando a etapa atual para a thread de trabalho"""
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+def registrar_resposta(response):
+    """Event hook de resposta do httpx: soma requisição, bytes e tempo de rede na etapa atual
+    (e conta as respostas coalescidas, ver services/coalescencia.py)"""
+    m = _etapa_atual.get()
+    if m is None:
+        return
+    # O corpo seria lido de qualquer forma pelo postgrest; ler aqui permite medir bytes e tempo
+    response.read()
+    with m._lock:
+        m.requisicoes += 1
+        if response.extensions.get("coalescida"):
+            m.coalescidas += 1
+        m.bytes += response.num_bytes_downloaded
+        m.rede_ms += response.elapsed.total_seconds() * 1000
+
+def iniciar_rerun():
+    """Chamado no início de cada execução do script: conta reruns e limpa as medições anteriores"""
+    st.session_state["_instrumentacao_reruns"] = st.session_state.get("_instrumentacao_reruns", 0) + 1
+    st.session_state["_instrumentacao_medicoes"] = []
+
+def medicoes_do_rerun() -> list:
+    return list(st.session_state.get("_instrumentacao_medicoes", []))
+
+def mostrar_painel():
+    """Painel de desempenho (barra lateral) com as etapas do rerun atual"""
+    with st.sidebar.expander("⏱️ Desempenho", expanded=True):
+        st.caption(f"Reruns nesta sessão: {st.session_state.get('_instrumentacao_reruns', 0)}")
+        medicoes = medicoes_do_rerun()
+        if not medicoes:
+            st.caption("Nenhuma etapa medida neste rerun.")
+            return
+        st.dataframe(
+            [
+                {
+                    "etapa": m["etapa"],
+                    "ms": m["duracao_ms"],
+                    "rede ms": m["rede_ms"],
+                    "req": m["requisicoes"],
+                    "coalesc.": m.get("coalescidas", 0),
+                    "KB": round(m["bytes"] / 1024, 1),
+                    "linhas": m["linhas"],
+                }
+                for m in medicoes
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
@@ -0,0 +1,376 @@
+import os
+import itertools
+from datetime import date, timedelta
+
+import pandas as pd
+
+from services.cache import SEM_EXPIRACAO, particao, resultados as cache_resultados
+from services import espelho
+from services.instrumentacao import instrumentado
+from services.paginacao import buscar_dataframe
+from services.planejamento import buscar_em_lotes, planejar_lotes
+from utils.helpers import is_vago_series, normalize_ano_series, normalize_series
+
+# Consultas de `movimentacao` sem Streamlit: recebem o cliente e o escopo de acesso
+# explicitamente e deixam as exceções subirem (quem chama decide como mostrar o erro).
+# Usadas pela página de consulta, pelo prefetch e pelo relatório em lote.
+
+# -------------------- ORDENAMENTO
+
+MESES_MAP = {
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARÇO": 3, "ABRIL": 4,
+    "MAIO": 5, "JUNHO": 6, "JULHO": 7, "AGOSTO": 8,
+    "SETEMBRO": 9, "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12
+}
+
+DESIGNACAO_MAP = {
+    "TITULAR": 1,
+    "DESIGNAÇÃO": 2,
+    "DESIGNAÇÃO TEMPORÁRIA": 3,
+    "AUXÍLIO": 4,
+    "AUXÍLIO TEMPORÁRIO": 5,
+}
+
+def _categorias(ordem_base, valores: pd.Series) -> list:
+    # Ordem do mapa primeiro; valores fora do mapa vão para o fim, em ordem alfabética
+    extras = sorted(set(valores.dropna().unique()) - set(ordem_base), key=str)
+    return list(ordem_base) + extras
+
+def aplicar_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte mes/designacao (categorias ordenadas) e orgao/membro (categorias) na entrada"""
+    if df.empty:
+        return df
+
+    df = df.copy()
+
+    if "mes" in df.columns and not isinstance(df["mes"].dtype, pd.CategoricalDtype):
+        df["mes"] = pd.Categorical(
+            df["mes"], categories=_categorias(MESES_MAP, df["mes"]), ordered=True
+        )
+
+    if "designacao" in df.columns and not isinstance(df["designacao"].dtype, pd.CategoricalDtype):
+        df["designacao"] = pd.Categorical(
+            df["designacao"],
+            categories=_categorias(DESIGNACAO_MAP, df["designacao"]),
+            ordered=True,
+        )
+
+    for col in ["orgao", "membro"]:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    return df
+
+@instrumentado("ordenar_por_mes_e_designacao")
+def ordenar_por_mes_e_designacao(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df
+
+    # Com as categorias ordenadas, a ordenação é direta (sem colunas auxiliares)
+    df = aplicar_schema(df)
+
+    sort_cols = [c for c in ["mes", "designacao", "membro", "orgao"] if c in df.columns]
+
+    if sort_cols:
+        df = df.sort_values(by=sort_cols, kind="mergesort")
+
+    return df
+
+# -------------------- CONSULTAS
+
+@instrumentado("listar_orgaos_unicos")
+def buscar_orgaos(supabase, escopo: str) -> list:
+    espelho.verificar_sincronizacao()
+    dados = cache_resultados.obter(escopo, "orgaos_distintos", "listar_orgaos_unicos")
+    if dados is None:
+        versao = cache_resultados.versao("orgaos_distintos")
+        dados = espelho.listar_orgaos()
+        if dados is None:
+            res = supabase.table("orgaos_distintos").select("orgao").order("orgao").execute()
+            dados = [r["orgao"] for r in res.data or []]
+        cache_resultados.guardar(escopo, "orgaos_distintos", "listar_orgaos_unicos", dados, versao=versao)
+    return dados
+
+# Identifica cada carga de partição guardada no cache (df.attrs["carga"])
+_cargas = itertools.count(1)
+
+# Partição das linhas com ano nulo (o mesmo -1 de normalize_ano_series): entra nas
+# consultas de todos os anos, como no filtro só por órgão
+ANO_NULO = -1
+
+# Dias do ano novo em que o ano anterior ainda recebe cargas (ex.: dezembro lançado em
+# janeiro) e por isso ainda não conta como fechado
+ANO_CARENCIA_DIAS = int(os.getenv("ANO_CARENCIA_DIAS", "90"))
+
+def ano_fechado(ano: int, hoje: date = None) -> bool:
+    hoje = hoje or date.today()
+    return hoje >= date(ano + 1, 1, 1) + timedelta(days=ANO_CARENCIA_DIAS)
+
+def ttl_ano(ano: int):
+    # Anos fechados não mudam mais: ficam no cache até sair por LRU ou invalidação.
+    # Linhas sem ano podem mudar a qualquer momento: TTL normal
+    if ano == ANO_NULO:
+        return None
+    return SEM_EXPIRACAO if ano_fechado(ano) else None
+
+def filtro_anos(q, anos: list, acima: int = None):
+    """in_ nos anos; com ANO_NULO na lista, também as linhas com ano nulo; com `acima`,
+    também os anos maiores que ele"""
+    reais = [a for a in anos if a != ANO_NULO]
+    condicoes = []
+    if reais:
+        condicoes.append(f"ano.in.({','.join(map(str, reais))})")
+    if len(reais) < len(anos):
+        condicoes.append("ano.is.null")
+    if acima is not None:
+        condicoes.append(f"ano.gt.{acima}")
+    if len(condicoes) > 1:
+        return q.or_(",".join(condicoes))
+    if reais:
+        return q.in_("ano", reais)
+    if acima is not None:
+        return q.gt("ano", acima)
+    return q.is_("ano", "null")
+
+@instrumentado("listar_anos")
+def buscar_anos(supabase, escopo: str) -> list:
+    """Anos de `movimentacao` em ordem crescente (opções do filtro e partições do cache).
+
+    Com o último ano fechado, a lista fica no cache sem expirar: um ano novo aparece
+    quando carregar_particoes o encontra (ou quando o espelho é sincronizado).
+    """
+    espelho.verificar_sincronizacao()
+    tabela = particao("movimentacao", "anos")
+    dados = cache_resultados.obter(escopo, tabela, "listar_anos")
+    if dados is None:
+        versao = cache_resultados.versao(tabela)
+        dados = espelho.listar_anos()
+        if dados is None:
+            # Sem DISTINCT no PostgREST: menor e maior ano (duas linhas) e o intervalo entre eles
+            def extremo(desc: bool):
+                res = (
+                    supabase.table("movimentacao").select("ano")
+                    .order("ano", desc=desc, nullsfirst=False).limit(1).execute()
+                )
+                return res.data[0]["ano"] if res.data else None
+            menor, maior = extremo(False), extremo(True)
+            dados = [] if menor is None or maior is None else list(range(int(menor), int(maior) + 1))
+        cache_resultados.guardar(
+            escopo, tabela, "listar_anos", dados, ttl=ttl_ano(max(dados)) if dados else None, versao=versao,
+        )
+    return dados
+
+def _montar(escopo: str, orgao: str, anos: list, partes: dict) -> pd.DataFrame:
+    # Resultado montado (concat + ordenação) dos anos do órgão: vale enquanto as partições
+    # no cache forem as mesmas cargas usadas para montá-lo
+    chave_montado = ("consultar_por_orgao", orgao, tuple(anos))
+    cargas = tuple(partes[ano].attrs.get("carga") for ano in anos)
+    montado = cache_resultados.obter(escopo, "movimentacao", chave_montado)
+    if montado is not None and montado.attrs.get("cargas") == cargas:
+        return montado
+    versao_montado = cache_resultados.versao("movimentacao")
+
+    nao_vazias = [partes[ano] for ano in anos if not partes[ano].empty]
+    if not nao_vazias:
+        montado = pd.DataFrame([])
+    else:
+        montado = pd.concat(nao_vazias, ignore_index=True) if len(nao_vazias) > 1 else nao_vazias[0]
+        montado = ordenar_por_mes_e_designacao(montado)
+    montado.attrs = {"anos": tuple(anos), "cargas": cargas}
+    cache_resultados.guardar(
+        escopo, "movimentacao", chave_montado, montado,
+        ttl=ttl_ano(max(anos)) if anos else None, versao=versao_montado,
+    )
+    return montado
+
+def carregar_particoes(supabase, escopo: str, orgaos: list, anos=None, ao_receber_pagina=None,
+                       cancelado=None) -> dict:
+    """Partições (órgão, ano) da Tabela 1 nos `anos` pedidos (None = todos): {orgao: {ano: DataFrame}}.
+
+    Sem `anos`, inclui a partição ANO_NULO (linhas com ano nulo) e os anos que a consulta
+    encontrar depois do último de buscar_anos.
+    O cache é por (órgão, ano), com aplicar_schema: anos fechados (ver ano_fechado)
+    ficam guardados sem expirar e os demais vencem pelo TTL. O que falta no cache, de
+    todos os órgãos, vem numa única consulta (in_ em orgao e ano) e é separado por órgão
+    aqui. Cada partição carregada recebe um número de carga novo (df.attrs["carga"]).
+    `cancelado` (threading.Event) interrompe a busca entre páginas (ver buscar_dataframe).
+    """
+    espelho.verificar_sincronizacao()
+    acima = None
+    if anos:
+        anos = sorted({int(a) for a in anos})
+    else:
+        # Todos os anos: os listados e a partição das linhas sem ano. A consulta também
+        # pede os anos depois do último listado, carregados depois da lista em cache
+        listados = buscar_anos(supabase, escopo)
+        anos = [ANO_NULO] + listados
+        acima = listados[-1] if listados else ANO_NULO
+    orgaos = list(dict.fromkeys(orgaos))
+
+    partes, faltantes, versoes = {}, [], {}
+    for orgao in orgaos:
+        chave = ("consultar_por_orgao", orgao)
+        for ano in anos:
+            tabela = particao("movimentacao", ano)
+            df = cache_resultados.obter(escopo, tabela, chave)
+            if df is None:
+                faltantes.append((orgao, ano))
+                versoes[orgao, ano] = cache_resultados.versao(tabela)
+            else:
+                partes[orgao, ano] = df
+
+    if faltantes:
+        orgaos_faltantes = sorted({orgao for orgao, _ in faltantes})
+        anos_faltantes = sorted({ano for _, ano in faltantes})
+        colunas = ["orgao", "ano", "mes", "membro", "designacao", "observacao"]
+        df = espelho.consultar_orgaos(
+            orgaos_faltantes, colunas,
+            [a for a in anos_faltantes if a != ANO_NULO], ANO_NULO in anos_faltantes,
+        )
+        if df is None:
+            df = buscar_dataframe(
+                supabase,
+                "movimentacao",
+                ", ".join(colunas),
+                filtros=lambda q: filtro_anos(q.in_("orgao", orgaos_faltantes), anos_faltantes, acima),
+                ordem=["orgao", "mes", "membro"],
+                ao_receber_pagina=ao_receber_pagina,
+                cancelado=cancelado,
+            )
+
+        # A Tabela 1 não tem a coluna orgao: ela só serve para separar o resultado
+        grupos = {}
+        if not df.empty:
+            chaves = [df["orgao"], normalize_ano_series(df["ano"])]
+            grupos = {chave: g.drop(columns="orgao") for chave, g in df.groupby(chaves, sort=False)}
+        vazio = df.iloc[0:0].drop(columns="orgao", errors="ignore")
+        for orgao, ano in faltantes:
+            parte = grupos.get((orgao, ano))
+            # No cache já com o schema (categorias): menos memória por partição
+            parte = vazio.copy() if parte is None else aplicar_schema(parte.reset_index(drop=True))
+            parte.attrs = {"carga": next(_cargas)}
+            cache_resultados.guardar(
+                escopo, particao("movimentacao", ano), ("consultar_por_orgao", orgao), parte,
+                ttl=ttl_ano(ano), versao=versoes[orgao, ano],
+            )
+            partes[orgao, ano] = parte
+
+        # Anos novos: a lista em cache ficou velha; as partições deles vêm de todos os órgãos
+        novos = sorted({ano for _, ano in grupos if ano not in anos})
+        if novos:
+            cache_resultados.invalidar(particao("movimentacao", "anos"))
+            extras = carregar_particoes(supabase, escopo, orgaos, novos, ao_receber_pagina, cancelado)
+            for orgao, por_ano in extras.items():
+                for ano, parte in por_ano.items():
+                    partes[orgao, ano] = parte
+            anos = anos + novos
+
+    return {orgao: {ano: partes[orgao, ano] for ano in anos} for orgao in orgaos}
+
+@instrumentado("consultar_por_orgao")
+def buscar_por_orgaos(supabase, escopo: str, orgaos: list, anos=None, ao_receber_pagina=None,
+                      cancelado=None) -> dict:
+    """Tabela 1 de cada órgão nos `anos` pedidos (None = todos): {orgao: DataFrame}.
+
+    Monta o resultado a partir das partições (órgão, ano) de carregar_particoes.
+    """
+    particoes = carregar_particoes(supabase, escopo, orgaos, anos, ao_receber_pagina, cancelado)
+    return {orgao: _montar(escopo, orgao, list(partes), partes) for orgao, partes in particoes.items()}
+
+def buscar_por_orgao(supabase, escopo: str, orgao: str, anos=None, ao_receber_pagina=None) -> pd.DataFrame:
+    """Tabela 1 de um órgão (ver buscar_por_orgaos)"""
+    return buscar_por_orgaos(supabase, escopo, [orgao], anos, ao_receber_pagina)[orgao]
+
+def _chaves_membro_mes_ano(membro: pd.Series, mes: pd.Series, ano: pd.Series) -> pd.MultiIndex:
+    return pd.MultiIndex.from_arrays(
+        [normalize_series(membro), normalize_series(mes), normalize_ano_series(ano)]
+    )
+
+def _trios(df_orgao: pd.DataFrame) -> pd.DataFrame:
+    # Trios (membro, mes, ano) normalizados da Tabela 1, excluindo 'VAGO' e ano nulo
+    df_pairs = pd.DataFrame({
+        "membro_norm": normalize_series(df_orgao["membro"]),
+        "mes_norm": normalize_series(df_orgao["mes"]),
+        "ano_norm": normalize_ano_series(df_orgao["ano"]),
+    })
+    return df_pairs[~is_vago_series(df_pairs["membro_norm"]) & df_pairs["ano_norm"].ne(-1)]
+
+@instrumentado("consultar_membros_mes_outros_orgaos_pares")
+def buscar_outros_por_orgaos(supabase, tabelas: dict, cancelado=None) -> dict:
+    """Tabela 2 de cada órgão de `tabelas` ({orgao: Tabela 1}): {orgao: DataFrame}.
+
+    Uma única busca sobre a união dos trios (membro, mes, ano) de todos os órgãos; depois
+    cada órgão fica só com as linhas de outros órgãos que casem exatamente um trio seu.
+    Exclui sempre membro = 'VAGO'. `cancelado` interrompe a busca entre páginas.
+    """
+    resultado = {orgao: pd.DataFrame([]) for orgao in tabelas}
+
+    trios = {
+        orgao: _trios(df) for orgao, df in tabelas.items()
+        if not df.empty and {"membro", "mes", "ano"} <= set(df.columns)
+    }
+    if not trios:
+        return resultado
+    df_pairs = pd.concat(trios.values(), ignore_index=True).drop_duplicates()
+
+    membros = sorted(df_pairs["membro_norm"].dropna().unique().tolist())
+    meses = sorted(df_pairs["mes_norm"].dropna().unique().tolist())
+    anos = sorted(int(a) for a in df_pairs["ano_norm"].unique())
+
+    if not membros or not meses:
+        return resultado
+
+    df_pares_busca = df_pairs.rename(columns={"membro_norm": "membro", "mes_norm": "mes", "ano_norm": "ano"})
+    colunas = ["mes", "ano", "orgao", "cod_orgao", "membro", "designacao", "observacao"]
+
+    # Com um órgão só, as linhas dele já ficam no servidor; com vários, as linhas de um
+    # selecionado são "outros órgãos" para os demais
+    excluidos = list(tabelas) if len(tabelas) == 1 else []
+
+    # Espelho local (índice em (membro, mes)), quando configurado
+    df_raw = espelho.consultar_pares(df_pares_busca, excluidos, colunas)
+
+    if df_raw is None:
+        # Consulta bruta no Supabase em lotes (listas in_ limitadas por bytes, por mês quando compensa),
+        # só nos anos da Tabela 1, excluindo 'VAGO' (e o órgão selecionado, se for um só)
+        def filtros(q):
+            q = q.in_("ano", anos).neq("membro", "VAGO")
+            return q.neq("orgao", excluidos[0]) if excluidos else q
+
+        lotes = planejar_lotes(df_pares_busca, "membro", "mes")
+        df_raw = buscar_em_lotes(
+            supabase,
+            "movimentacao",
+            ", ".join(colunas),
+            lotes,
+            filtros=filtros,
+            ordem=["mes", "membro", "orgao"],
+            cancelado=cancelado,
+        )
+
+    if df_raw.empty:
+        return {orgao: df_raw for orgao in tabelas}
+
+    # Chaves das linhas brutas normalizadas uma vez; cada órgão filtra pelos seus trios
+    chaves_raw = _chaves_membro_mes_ano(df_raw["membro"], df_raw["mes"], df_raw["ano"])
+    cols = [c for c in ["orgao", "cod_orgao", "mes", "ano", "membro", "designacao", "observacao"] if c in df_raw.columns]
+
+    for orgao, df_trios in trios.items():
+        chaves_pares = pd.MultiIndex.from_arrays(
+            [df_trios["membro_norm"], df_trios["mes_norm"], df_trios["ano_norm"]]
+        )
+        # Mantém apenas (membro, mes, ano) que existam na Tabela 1 do órgão, em outros órgãos
+        outro_orgao = df_raw["orgao"].notna() & df_raw["orgao"].ne(orgao)
+        manter = chaves_raw.isin(chaves_pares) & outro_orgao.to_numpy()
+        df_outros = df_raw.loc[manter, cols]
+
+        #Ordena pela ordem customizada
+        df_outros = ordenar_por_mes_e_designacao(df_outros)
+
+        df_outros.reset_index(drop=True, inplace=True)
+        resultado[orgao] = df_outros
+    return resultado
+
+def buscar_outros_orgaos(supabase, df_orgao: pd.DataFrame, orgao_sel: str) -> pd.DataFrame:
+    """Tabela 2 de um órgão (ver buscar_outros_por_orgaos)"""
+    return buscar_outros_por_orgaos(supabase, {orgao_sel: df_orgao})[orgao_sel]
@@ -0,0 +1,99 @@
+import pandas as pd
+
+from services.instrumentacao import instrumentado
+from services.movimentacao import aplicar_schema
+from services.paginacao import iterar_anos
+from utils.helpers import is_vago_series, normalize_ano_series, normalize_series
+
+# -------------------- MULTI-LOTAÇÃO (todos os órgãos)
+#
+# Membros que aparecem em mais de um órgão no mesmo (mes, ano), numa única leitura de
+# `movimentacao` ordenada por ano. Cada ano é agrupado (groupby por hash) assim que a
+# leitura passa dele e depois descartado: a memória fica em ~1 ano de linhas + a janela
+# de páginas, não no histórico inteiro.
+
+COLUNAS = ["ano", "mes", "orgao", "cod_orgao", "membro", "designacao", "observacao"]
+
+CHAVE = ["_membro", "_mes", "_ano"]
+
+COLUNAS_RESUMO = ["orgao", "registros", "membros", "meses", "outros_orgaos"]
+
+def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+    # Chaves normalizadas como na Tabela 2; VAGO (mesma regra de is_vago), membro vazio e
+    # ano nulo (o mês de um ano desconhecido não é o mesmo período) ficam de fora
+    membro = normalize_series(df["membro"])
+    ano = normalize_ano_series(df["ano"])
+    manter = ~is_vago_series(membro) & membro.ne("") & ano.ne(-1)
+    df = df[manter]
+    return df.assign(
+        _membro=membro[manter],
+        _mes=normalize_series(df["mes"]),
+        _ano=ano[manter],
+        _orgao=normalize_series(df["orgao"]),
+    )
+
+def _conflitos_do_ano(df: pd.DataFrame) -> pd.DataFrame:
+    qtd = df.groupby(CHAVE, sort=False)["_orgao"].transform("nunique")
+    conflito = qtd > 1
+    return df[conflito].assign(qtd_orgaos=qtd[conflito])
+
+def resumo_por_orgao(conflitos: pd.DataFrame) -> pd.DataFrame:
+    """Por órgão: linhas em conflito, membros e meses distintos e quantos outros órgãos envolvidos"""
+    if conflitos.empty:
+        return pd.DataFrame(columns=COLUNAS_RESUMO)
+
+    por_chave = conflitos[CHAVE + ["_orgao"]].drop_duplicates()
+    cruzado = por_chave.merge(por_chave, on=CHAVE, suffixes=("", "_outro"))
+    cruzado = cruzado[cruzado["_orgao"] != cruzado["_orgao_outro"]]
+    outros = cruzado.groupby("_orgao")["_orgao_outro"].nunique().rename("outros_orgaos")
+
+    base = conflitos.assign(_periodo=conflitos["_ano"].astype(str) + "/" + conflitos["_mes"])
+    resumo = base.groupby("_orgao").agg(
+        orgao=("orgao", "first"),
+        registros=("_orgao", "size"),
+        membros=("_membro", "nunique"),
+        meses=("_periodo", "nunique"),
+    )
+    resumo = resumo.join(outros)
+    return (
+        resumo[COLUNAS_RESUMO]
+        .sort_values(["registros", "orgao"], ascending=[False, True], kind="mergesort")
+        .reset_index(drop=True)
+    )
+
+@instrumentado("detectar_multilotacao", linhas=lambda r: len(r["conflitos"]))
+def detectar_multilotacao(supabase, ano_inicial: int = None, ano_final: int = None,
+                          tamanho_pagina: int = None) -> dict:
+    """Varre `movimentacao` (ou só os anos pedidos) uma vez.
+
+    Retorna {"conflitos": uma linha por ocorrência de membro em 2+ órgãos no mesmo
+    (mes, ano), com qtd_orgaos; "por_orgao": resumo_por_orgao dos conflitos}.
+    """
+    def filtros(q):
+        if ano_inicial is not None:
+            q = q.gte("ano", ano_inicial)
+        if ano_final is not None:
+            q = q.lte("ano", ano_final)
+        return q
+
+    encontrados = [
+        _conflitos_do_ano(df)
+        for _, df in iterar_anos(supabase, "movimentacao", ", ".join(COLUNAS), filtros=filtros,
+                                 preparar=_preparar, tamanho_pagina=tamanho_pagina)
+    ]
+
+    encontrados = [df for df in encontrados if not df.empty]
+    if not encontrados:
+        return {
+            "conflitos": pd.DataFrame(columns=COLUNAS + ["qtd_orgaos"]),
+            "por_orgao": resumo_por_orgao(pd.DataFrame()),
+        }
+
+    conflitos = pd.concat(encontrados, ignore_index=True)
+    por_orgao = resumo_por_orgao(conflitos)
+
+    conflitos = aplicar_schema(conflitos).sort_values(
+        ["_ano", "mes", "_membro", "orgao"], kind="mergesort"
+    )
+    cols = [c for c in COLUNAS + ["qtd_orgaos"] if c in conflitos.columns]
+    return {"conflitos": conflitos[cols].reset_index(drop=True), "por_orgao": por_orgao}
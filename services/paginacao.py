@@ -0,0 +1,213 @@
+import os
+import io
+import logging
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from services.instrumentacao import submeter
+from utils.helpers import normalize_ano_series
+
+logger = logging.getLogger(__name__)
+
+# -------------------- PAGINAÇÃO
+
+# Tamanho de página pedido ao PostgREST (se o servidor tiver max-rows menor, ele é respeitado)
+TAMANHO_PAGINA = int(os.getenv("SUPABASE_TAMANHO_PAGINA", "1000"))
+
+# Máximo de páginas buscadas ao mesmo tempo
+MAX_WORKERS_PAGINAS = int(os.getenv("SUPABASE_MAX_WORKERS_PAGINAS", "4"))
+
+# Formato das respostas das tabelas com tipos conhecidos: "csv" (text/csv lido pelo parser
+# C do pandas, sem a lista de dicts intermediária) ou "json" (caminho padrão do postgrest)
+FORMATO_INGESTAO = os.getenv("SUPABASE_FORMATO", "csv").strip().lower()
+
+# Tipos das colunas lidas em CSV; tabelas fora daqui sempre vêm em JSON
+TIPOS_CSV = {
+    "movimentacao": {
+        "ano": "Int64",
+        "mes": "str",
+        "orgao": "str",
+        "membro": "str",
+        "designacao": "str",
+        "observacao": "str",
+    },
+}
+
+class BuscaCancelada(Exception):
+    """A busca parou entre duas páginas porque o evento `cancelado` foi acionado"""
+
+def _colunas(colunas: str) -> list:
+    return [c.strip() for c in colunas.split(",") if c.strip()]
+
+def _formato(tabela: str, formato: str = None) -> str:
+    if formato is None:
+        formato = FORMATO_INGESTAO if tabela in TIPOS_CSV else "json"
+    if formato not in ("csv", "json"):
+        raise ValueError(f"Formato de ingestão desconhecido: {formato!r}")
+    return formato
+
+def ler_csv(texto: str, tabela: str) -> pd.DataFrame:
+    """Converte uma resposta text/csv do PostgREST em DataFrame com os tipos de TIPOS_CSV"""
+    if not texto or not texto.strip():
+        return pd.DataFrame([])
+    # NULL chega como campo vazio; textos como "NA" ou "NULL" continuam sendo texto
+    return pd.read_csv(
+        io.StringIO(texto),
+        dtype=TIPOS_CSV.get(tabela),
+        keep_default_na=False,
+        na_values=[""],
+        engine="c",
+    )
+
+def _executar(q, tabela: str, formato: str) -> tuple:
+    # (DataFrame da página, total informado pelo count ou None)
+    if formato == "csv":
+        res = q.csv().execute()
+        texto = res.data if isinstance(res.data, str) else ""
+        return ler_csv(texto, tabela), res.count
+    res = q.execute()
+    return pd.DataFrame(res.data or []), res.count
+
+def _montar_query(supabase, tabela: str, colunas: str, filtros=None, ordem=(), count=None):
+    q = supabase.table(tabela).select(colunas, count=count)
+    if filtros is not None:
+        q = filtros(q)
+
+    # Ordem total: completa a ordem pedida com as demais colunas, para que os ranges
+    # de páginas diferentes não se sobreponham nem pulem linhas
+    ordem = list(ordem)
+    for col in ordem + [c for c in _colunas(colunas) if c not in ordem]:
+        q = q.order(col)
+    return q
+
+def _paginas(supabase, tabela: str, colunas: str, filtros=None, ordem=(),
+             tamanho_pagina: int = None, max_workers: int = None, formato: str = None,
+             cancelado=None):
+    # Gera (DataFrame, total) por página, em ordem; com `cancelado` (threading.Event)
+    # acionado, levanta BuscaCancelada antes da próxima página
+    tamanho_pagina = tamanho_pagina or TAMANHO_PAGINA
+    max_workers = max_workers or MAX_WORKERS_PAGINAS
+    formato = _formato(tabela, formato)
+
+    primeira, total = _executar(
+        _montar_query(supabase, tabela, colunas, filtros, ordem, count="exact")
+        .range(0, tamanho_pagina - 1),
+        tabela,
+        formato,
+    )
+    if total is None:
+        total = len(primeira)
+
+    yield primeira, total
+
+    if len(primeira) >= total:
+        return
+
+    # O servidor pode limitar a página abaixo do pedido (max-rows): usa o que ele devolveu
+    if 0 < len(primeira) < tamanho_pagina:
+        tamanho_pagina = len(primeira)
+
+    def buscar(inicio: int):
+        fim = min(inicio + tamanho_pagina, total) - 1
+        df, _ = _executar(
+            _montar_query(supabase, tabela, colunas, filtros, ordem).range(inicio, fim),
+            tabela,
+            formato,
+        )
+        return df
+
+    inicios = iter(range(len(primeira), total, tamanho_pagina))
+    recebidas = len(primeira)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Janela limitada: no máximo 2 × max_workers páginas à frente de quem consome,
+        # então a memória não cresce com o total quando as páginas são descartadas ao chegar
+        janela = deque(
+            submeter(pool, buscar, inicio)
+            for inicio in itertools.islice(inicios, 2 * max_workers)
+        )
+        try:
+            while janela:
+                if cancelado is not None and cancelado.is_set():
+                    raise BuscaCancelada()
+                dados = janela.popleft().result()
+                proximo = next(inicios, None)
+                if proximo is not None:
+                    janela.append(submeter(pool, buscar, proximo))
+                recebidas += len(dados)
+                yield dados, total
+        finally:
+            for fut in janela:
+                fut.cancel()
+
+    if recebidas != total:
+        logger.warning(
+            "Paginação de '%s' retornou %s linhas, mas o total informado era %s",
+            tabela, recebidas, total,
+        )
+
+def iterar_paginas(supabase, tabela: str, colunas: str, filtros=None, ordem=(),
+                   tamanho_pagina: int = None, max_workers: int = None, formato: str = None):
+    """Gera as páginas (DataFrames) em ordem, à medida que chegam.
+
+    A primeira página traz o total (count=exact); as demais são buscadas em paralelo
+    por um pool limitado de threads. `formato` ("csv" ou "json") sobrepõe FORMATO_INGESTAO.
+    """
+    for df, _ in _paginas(supabase, tabela, colunas, filtros, ordem,
+                          tamanho_pagina, max_workers, formato):
+        yield df
+
+def iterar_anos(supabase, tabela: str, colunas: str, filtros=None, preparar=None,
+                tamanho_pagina: int = None):
+    """Gera (ano, DataFrame com as linhas do ano) numa única leitura ordenada por ano.
+
+    As páginas chegam em ordem de ano: um ano novo fecha o anterior, então só ~1 ano de
+    linhas fica em memória. `preparar` é aplicado a cada página antes de separar os anos;
+    o ano é o de normalize_ano_series (nulo = -1).
+    """
+    partes, ano_atual = [], None
+    for pagina in iterar_paginas(supabase, tabela, colunas, filtros=filtros,
+                                 ordem=["ano"], tamanho_pagina=tamanho_pagina):
+        if pagina.empty:
+            continue
+        if preparar is not None:
+            pagina = preparar(pagina)
+        for ano, parte in pagina.groupby(normalize_ano_series(pagina["ano"]), sort=False):
+            if ano != ano_atual and partes:
+                yield ano_atual, _juntar(partes)
+                partes = []
+            ano_atual = ano
+            partes.append(parte)
+    if partes:
+        yield ano_atual, _juntar(partes)
+
+def _juntar(partes: list) -> pd.DataFrame:
+    partes = [df for df in partes if not df.empty]
+    if not partes:
+        return pd.DataFrame([])
+    if len(partes) == 1:
+        return partes[0]
+    return pd.concat(partes, ignore_index=True)
+
+def buscar_dataframe(supabase, tabela: str, colunas: str, filtros=None, ordem=(),
+                     tamanho_pagina: int = None, max_workers: int = None,
+                     ao_receber_pagina=None, formato: str = None, cancelado=None) -> pd.DataFrame:
+    """Busca todas as páginas e junta num único DataFrame.
+
+    Se o resultado tiver mais de uma página e `ao_receber_pagina` for informado, ele é
+    chamado com cada página que chega, menos a última (para mostrar as primeiras linhas
+    antes do fim); quem chama guarda o que precisar delas. Se `cancelado` (threading.Event)
+    for acionado, a busca para entre duas páginas com BuscaCancelada.
+    """
+    partes = []
+    recebidas = 0
+    for df, total in _paginas(supabase, tabela, colunas, filtros, ordem,
+                              tamanho_pagina, max_workers, formato, cancelado):
+        partes.append(df)
+        recebidas += len(df)
+        if ao_receber_pagina is not None and 0 < recebidas < total:
+            ao_receber_pagina(df)
+
+    return _juntar(partes)
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+
+from services.instrumentacao import submeter
+from services.paginacao import buscar_dataframe
+
+# -------------------- PLANEJAMENTO DE FILTROS IN
+
+# Orçamento (bytes, já codificados na URL) para a lista de um filtro in.(...)
+LIMITE_BYTES_FILTRO = int(os.getenv("SUPABASE_LIMITE_BYTES_FILTRO", "6000"))
+
+# Máximo de consultas (lotes) executadas ao mesmo tempo
+MAX_WORKERS_LOTES = int(os.getenv("SUPABASE_MAX_WORKERS_LOTES", "4"))
+
+# Custo fixo estimado de uma requisição, em "linhas equivalentes"
+CUSTO_REQUISICAO = 200
+
+def bytes_valor_in(valor) -> int:
+    # Mesmo escape do postgrest-py (aspas se houver , : ( ) ) + codificação da URL + vírgula
+    texto = str(valor)
+    if any(c in texto for c in ",:()"):
+        texto = f'"{texto}"'
+    return len(quote(texto, safe="")) + len(quote(",", safe=""))
+
+def dividir_por_bytes(valores, limite: int = None) -> list:
+    """Divide `valores` em lotes cuja lista in.(...) cabe em `limite` bytes"""
+    limite = limite or LIMITE_BYTES_FILTRO
+    lotes, atual, usado = [], [], 0
+    for v in valores:
+        tam = bytes_valor_in(v)
+        if atual and usado + tam > limite:
+            lotes.append(atual)
+            atual, usado = [], 0
+        atual.append(v)
+        usado += tam
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+def planejar_lotes(df_pares: pd.DataFrame, col_lista: str, col_grupo: str,
+                   limite: int = None) -> list:
+    """Planeja os filtros para buscar os pares (col_lista, col_grupo) de `df_pares`.
+
+    Retorna uma lista de dicts {coluna: [valores]} para usar com in_. Compara duas
+    estratégias e fica com a mais barata:
+    - produto: lotes de todos os valores de col_lista × todos os de col_grupo;
+    - por grupo: para cada valor de col_grupo, só os valores de col_lista daquele grupo.
+    """
+    pares = df_pares[[col_lista, col_grupo]].drop_duplicates()
+    if pares.empty:
+        return []
+
+    lista = sorted(pares[col_lista].unique().tolist())
+    grupos = sorted(pares[col_grupo].unique().tolist())
+
+    lotes_produto = [
+        {col_lista: lote, col_grupo: grupos}
+        for lote in dividir_por_bytes(lista, limite)
+    ]
+    # Linhas candidatas ~ combinações trazidas pelo servidor
+    custo_produto = len(lotes_produto) * CUSTO_REQUISICAO + len(lista) * len(grupos)
+
+    lotes_grupo = []
+    for grupo, sub in pares.groupby(col_grupo, sort=True):
+        for lote in dividir_por_bytes(sorted(sub[col_lista].tolist()), limite):
+            lotes_grupo.append({col_lista: lote, col_grupo: [grupo]})
+    custo_grupo = len(lotes_grupo) * CUSTO_REQUISICAO + len(pares)
+
+    return lotes_grupo if custo_grupo < custo_produto else lotes_produto
+
+def buscar_em_lotes(supabase, tabela: str, colunas: str, lotes: list, filtros=None,
+                    ordem=(), max_workers: int = None, cancelado=None) -> pd.DataFrame:
+    """Executa um lote por consulta (paginada), em paralelo, e junta tudo na ordem pedida.
+
+    `cancelado` (threading.Event) é repassado a buscar_dataframe de cada lote.
+    """
+    if not lotes:
+        return pd.DataFrame([])
+
+    max_workers = max_workers or MAX_WORKERS_LOTES
+
+    def buscar(lote: dict) -> pd.DataFrame:
+        def aplicar(q):
+            for col, valores in lote.items():
+                q = q.in_(col, valores)
+            return filtros(q) if filtros is not None else q
+        return buscar_dataframe(supabase, tabela, colunas, filtros=aplicar, ordem=ordem, cancelado=cancelado)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futuros = [submeter(pool, buscar, lote) for lote in lotes]
+        partes = [df for df in (f.result() for f in futuros) if not df.empty]
+
+    if not partes:
+        return pd.DataFrame([])
+
+    df = pd.concat(partes, ignore_index=True)
+    if len(partes) > 1:
+        # Reproduz a ordem que uma única consulta teria devolvido
+        ordem = list(ordem)
+        cols = ordem + [c.strip() for c in colunas.split(",") if c.strip() and c.strip() not in ordem]
+        df = df.sort_values(cols, kind="mergesort").reset_index(drop=True)
+    return df
@@ -0,0 +1,63 @@
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from services.paginacao import BuscaCancelada
+
+logger = logging.getLogger(__name__)
+
+# -------------------- PREFETCH ESPECULATIVO
+#
+# Executa uma sequência de etapas numa thread de trabalho (cada etapa recebe o resultado
+# da anterior e o evento de cancelamento) e expõe o resultado de cada etapa assim que fica
+# pronto. Cancelar interrompe a sequência antes da próxima etapa e, nas etapas que repassam
+# o evento a buscar_dataframe, antes da próxima página.
+
+PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+
+class PrefetchCancelado(BuscaCancelada):
+    pass
+
+class Prefetch:
+    def __init__(self, chave, etapas: list):
+        self.chave = chave
+        self._cancelado = threading.Event()
+        self._resultados = [Future() for _ in etapas]
+        self._tarefa = _executor.submit(self._executar, etapas)
+
+    def _executar(self, etapas):
+        anterior = None
+        try:
+            for etapa, futuro in zip(etapas, self._resultados):
+                if self._cancelado.is_set():
+                    raise PrefetchCancelado()
+                anterior = etapa(anterior, self._cancelado)
+                futuro.set_result(anterior)
+        except BaseException as ex:
+            if not isinstance(ex, BuscaCancelada):
+                logger.warning("Prefetch de %s falhou: %s", self.chave, ex)
+            for futuro in self._resultados:
+                if not futuro.done():
+                    futuro.set_exception(ex)
+
+    def cancelar(self):
+        self._cancelado.set()
+        self._tarefa.cancel()
+        if self._tarefa.cancelled():
+            for futuro in self._resultados:
+                if not futuro.done():
+                    futuro.set_exception(PrefetchCancelado())
+
+    @property
+    def cancelado(self) -> bool:
+        return self._cancelado.is_set()
+
+    def resultado(self, etapa: int, timeout: float = None):
+        """Resultado da etapa (espera se ainda estiver em andamento); None se falhou ou foi cancelada"""
+        try:
+            return self._resultados[etapa].result(timeout=timeout)
+        except Exception:
+            return None
@@ -0,0 +1,113 @@
+import pandas as pd
+
+from services import espelho
+from services.cache import particao, resultados as cache_resultados
+from services.instrumentacao import instrumentado
+from services.movimentacao import buscar_anos, carregar_particoes, ttl_ano
+from services.paginacao import iterar_anos
+from utils.analise import painel_orgaos, resumir, resumir_por_orgao
+
+# -------------------- RESUMO MENSAL (agregados por órgão e ano)
+#
+# Contagens por ano_mes e categoria (Auxílio, Designação, VAGO), totais e membros
+# distintos de cada partição (órgão, ano), guardados no cache junto da partição. As
+# análises somam esses resumos em vez de varrer as linhas da Tabela 1. Cada resumo
+# lembra a carga da partição de onde saiu: quando ela é recarregada (ex.: o ano corrente
+# com meses novos), só o resumo desse ano é refeito; os anos fechados continuam valendo.
+
+COLUNAS = ["ano", "orgao", "mes", "membro", "designacao"]
+
+def _resumo_em_cache(escopo: str, orgao: str, ano: int, carga):
+    resumo = cache_resultados.obter(escopo, particao("movimentacao", ano), ("resumo_mensal", orgao))
+    return resumo if resumo is not None and resumo["carga"] == carga else None
+
+def _resumo_da_particao(escopo: str, orgao: str, ano: int, parte: pd.DataFrame) -> dict:
+    carga = parte.attrs.get("carga")
+    resumo = _resumo_em_cache(escopo, orgao, ano, carga)
+    if resumo is not None:
+        return resumo
+    tabela = particao("movimentacao", ano)
+    versao = cache_resultados.versao(tabela)
+    resumo = dict(resumir(parte), carga=carga)
+    cache_resultados.guardar(escopo, tabela, ("resumo_mensal", orgao), resumo, ttl=ttl_ano(ano), versao=versao)
+    return resumo
+
+@instrumentado("resumo_mensal")
+def buscar_resumos(supabase, escopo: str, orgaos: list, anos=None, ao_receber_pagina=None) -> dict:
+    """Resumos (ver utils.analise.resumir) de cada órgão, um por ano: {orgao: [resumo, ...]}.
+
+    Na instrumentação, `linhas` é o número de resumos (partições órgão/ano).
+
+    As partições que não estiverem no cache são buscadas como em buscar_por_orgaos.
+    """
+    particoes = carregar_particoes(supabase, escopo, orgaos, anos, ao_receber_pagina)
+    return {
+        orgao: [_resumo_da_particao(escopo, orgao, ano, parte) for ano, parte in partes.items()]
+        for orgao, partes in particoes.items()
+    }
+
+@instrumentado("resumo_mensal")
+def resumos_da_tabela(escopo: str, orgao: str, df: pd.DataFrame):
+    """Resumos das partições de onde saiu a Tabela 1 `df` (attrs "anos" e "cargas" de
+    buscar_por_orgaos), sem consultar a base.
+
+    Cada resumo vem do cache ou da partição que ainda estiver nele, desde que seja a
+    mesma carga. Se alguma partição já saiu do cache, None: quem chama analisa as linhas.
+    """
+    anos, cargas = df.attrs.get("anos"), df.attrs.get("cargas")
+    if anos is None or cargas is None:
+        return None
+    resumos = []
+    for ano, carga in zip(anos, cargas):
+        resumo = _resumo_em_cache(escopo, orgao, ano, carga)
+        if resumo is None:
+            parte = cache_resultados.obter(escopo, particao("movimentacao", ano), ("consultar_por_orgao", orgao))
+            if parte is None or parte.attrs.get("carga") != carga:
+                return None
+            resumo = _resumo_da_particao(escopo, orgao, ano, parte)
+        resumos.append(resumo)
+    return resumos
+
+@instrumentado("painel_orgaos")
+def buscar_painel_orgaos(supabase, escopo: str, anos=None, tamanho_pagina: int = None) -> pd.DataFrame:
+    """Painel de todos os órgãos nos `anos` pedidos (None = todos), ver utils.analise.painel_orgaos.
+
+    Os resumos de cada ano ficam no cache ({orgao: resumo}); os anos que faltarem vêm numa
+    única leitura de `movimentacao` ordenada por ano (paginacao.iterar_anos), agregada
+    ano a ano.
+    """
+    espelho.verificar_sincronizacao()
+    anos = sorted({int(a) for a in anos}) if anos else buscar_anos(supabase, escopo)
+
+    por_ano, faltantes, versoes = {}, [], {}
+    for ano in anos:
+        tabela = particao("movimentacao", ano)
+        resumos = cache_resultados.obter(escopo, tabela, "painel_orgaos")
+        if resumos is None:
+            faltantes.append(ano)
+            versoes[ano] = cache_resultados.versao(tabela)
+        else:
+            por_ano[ano] = resumos
+
+    def fechar(ano, df):
+        por_ano[ano] = resumir_por_orgao(df)
+        cache_resultados.guardar(
+            escopo, particao("movimentacao", ano), "painel_orgaos", por_ano[ano],
+            ttl=ttl_ano(ano), versao=versoes[ano],
+        )
+
+    if faltantes:
+        for ano, df in iterar_anos(supabase, "movimentacao", ", ".join(COLUNAS),
+                                   filtros=lambda q: q.in_("ano", faltantes),
+                                   tamanho_pagina=tamanho_pagina):
+            fechar(ano, df)
+        # Anos sem nenhuma linha também ficam guardados (vazios)
+        for ano in faltantes:
+            if ano not in por_ano:
+                fechar(ano, pd.DataFrame(columns=COLUNAS))
+
+    resumos = {}
+    for ano in anos:
+        for orgao, resumo in por_ano[ano].items():
+            resumos.setdefault(orgao, []).append(resumo)
+    return painel_orgaos(resumos)
@@ -1,37 +1,393 @@
 import os
+import json
+import time
+import heapq
+import base64
+import hashlib
+import logging
+import weakref
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 import streamlit as st
 from supabase import Client, create_client, ClientOptions
 from dotenv import load_dotenv
 
-load_dotenv()
+from services.coalescencia import TransporteCoalescente
+from services.instrumentacao import registrar_resposta
+
+logger = logging.getLogger(__name__)
+
+# -------------------- CONFIGURAÇÃO
+#
+# Lida e validada na criação do primeiro cliente, não no import: importar este módulo
+# não exige as variáveis (o .env costuma ser carregado antes, pelo ponto de entrada).
+
+_config = None
+
+def configuracao() -> tuple:
+    """(url, anon key) do Supabase; sem elas, mostra o erro e interrompe o script"""
+    global _config
+    if _config is None:
+        load_dotenv()
+        url = os.getenv("SUPABASE_URL")
+        chave = os.getenv("SUPABASE_ANON_KEY")
+        if not url or not chave:
+            st.error("⚠️ Configure SUPABASE_URL e SUPABASE_ANON_KEY nos Secrets do Streamlit.")
+            st.stop()
+            # Fora de uma sessão do Streamlit, st.stop() não interrompe nada
+            raise RuntimeError("SUPABASE_URL e SUPABASE_ANON_KEY não configurados")
+        _config = (url, chave)
+    return _config
+
+# -------------------- POOL DE CLIENTES
+
+# Máximo de clientes autenticados mantidos vivos no processo (um por access token)
+POOL_MAX_CLIENTES = int(os.getenv("SUPABASE_POOL_MAX_CLIENTES", "64"))
+
+# Validade assumida quando não é possível ler o 'exp' do JWT
+POOL_TTL_PADRAO = 3600
+
+# Escopo dos caches compartilhados: "usuario" (padrão, seguro para qualquer RLS) ou
+# "papel" (só se as políticas de RLS dependerem apenas do papel, não do usuário)
+CACHE_ESCOPO = os.getenv("CACHE_ESCOPO", "usuario")
+
+_pool_lock = threading.Lock()
+_http_client = None
+_anon_client = None
+_auth_clients = OrderedDict()  # token -> (Client, expira_em)
+
+# Tokens recebidos do servidor de auth (login ou renovação): só as claims deles definem o
+# escopo dos caches. Um token qualquer tem as claims lidas sem conferir a assinatura.
+_tokens_verificados = OrderedDict()  # token -> claims
+
+def novo_http_client(transporte: httpx.BaseTransport) -> httpx.Client:
+    """Cliente httpx da aplicação sobre `transporte` (o de rede, ou um fake nos benchmarks)"""
+    return httpx.Client(
+        # Leituras idênticas em andamento (mesma URL e mesmo token) saem uma vez só
+        transport=TransporteCoalescente(transporte),
+        follow_redirects=True,
+        timeout=httpx.Timeout(120.0, connect=10.0),
+        event_hooks={"response": [registrar_resposta]},
+        # Sem headers explícitos: o httpx já pede resposta comprimida (Accept-Encoding
+        # gzip/deflate, e br/zstd quando brotli/zstandard estão instalados)
+    )
+
+def _get_http_client() -> httpx.Client:
+    """Pool de conexões HTTP (keep-alive) compartilhado por todos os clientes do processo"""
+    global _http_client
+    with _pool_lock:
+        if _http_client is None:
+            _http_client = novo_http_client(httpx.HTTPTransport(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60.0,
+                ),
+            ))
+        return _http_client
+
+def _claims_token(token: str) -> dict:
+    """Payload do JWT, sem validar assinatura (só para o pool; quem valida é o servidor)"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except Exception:
+        return {}
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
+def _expiracao_token(token: str) -> float:
+    exp = _claims_token(token).get("exp")
+    return float(exp) if exp else time.time() + POOL_TTL_PADRAO
 
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-    st.error("⚠️ Configure SUPABASE_URL e SUPABASE_ANON_KEY nos Secrets do Streamlit.")
-    st.stop()
+def _remover_expirados(agora: float):
+    for token in [t for t, (_, exp) in _auth_clients.items() if exp <= agora]:
+        del _auth_clients[token]
+
+def registrar_token_verificado(token: str):
+    """Access token vindo do servidor de auth (res.session do login ou da renovação): as
+    claims dele passam a valer para o escopo (ver escopo_token)"""
+    if not token:
+        return
+    claims = _claims_token(token)
+    agora = time.time()
+    with _pool_lock:
+        for t in [t for t, c in _tokens_verificados.items() if float(c.get("exp") or agora + 1) <= agora]:
+            del _tokens_verificados[t]
+        _tokens_verificados[token] = claims
+        while len(_tokens_verificados) > 4 * POOL_MAX_CLIENTES:
+            _tokens_verificados.popitem(last=False)
+
+def _claims_verificadas(token: str):
+    with _pool_lock:
+        return _tokens_verificados.get(token)
 
 def get_anon_client():
+    """Cliente anônimo único por processo"""
+    global _anon_client
+    http_client = _get_http_client()
+    with _pool_lock:
+        if _anon_client is None:
+            _anon_client = create_client(
+                *configuracao(),
+                options=ClientOptions(httpx_client=http_client),
+            )
+        return _anon_client
+
+def novo_cliente_login() -> Client:
+    """Cliente exclusivo para o login: o sign-in altera o estado do cliente, então não pode ser o compartilhado"""
     return create_client(
-        SUPABASE_URL,
-        SUPABASE_ANON_KEY
+        *configuracao(),
+        # Sem o timer de auto-refresh do gotrue: ele renovaria (e rotacionaria) o refresh
+        # token guardado na sessão por conta própria. Quem renova é o SessaoAuth.
+        options=ClientOptions(
+            httpx_client=_get_http_client(),
+            auto_refresh_token=False,
+            persist_session=False,
+        ),
     )
 
-def get_auth_client():
-    if "token" in st.session_state and st.session_state.token:
-        return create_client(
-            SUPABASE_URL,
-            SUPABASE_ANON_KEY,
+def cliente_para_token(token: str) -> Client:
+    """Cliente autenticado do pool para um access token (sem depender da sessão do Streamlit)"""
+    if not token:
+        return get_anon_client()
+
+    http_client = _get_http_client()
+    agora = time.time()
+    with _pool_lock:
+        _remover_expirados(agora)
+
+        item = _auth_clients.get(token)
+        if item is not None:
+            _auth_clients.move_to_end(token)
+            return item[0]
+
+        client = create_client(
+            *configuracao(),
             options=ClientOptions(
                 headers={
-                    "Authorization": f"Bearer {st.session_state.token}"
+                    "Authorization": f"Bearer {token}"
                 },
+                httpx_client=http_client,
                 auto_refresh_token=True,
                 persist_session=True
             )
         )
-    return get_anon_client()
+        _auth_clients[token] = (client, _expiracao_token(token))
+
+        # LRU: descarta os clientes usados há mais tempo
+        while len(_auth_clients) > POOL_MAX_CLIENTES:
+            _auth_clients.popitem(last=False)
+
+        return client
+
+# -------------------- SESSÃO DE AUTENTICAÇÃO
+#
+# Cada sessão do Streamlit guarda um SessaoAuth (st.session_state["_auth"]) com os tokens
+# do login. Um agendador único do processo renova a sessão em segundo plano antes de o
+# access token vencer (refresh token -> novo par de tokens); pedidos simultâneos de
+# renovação da mesma sessão viram uma só. get_auth_client entrega o cliente do pool do
+# token atual: consultas não chegam a levar 401 por token vencido nem exigem novo login.
+
+# Antecedência da renovação em relação ao vencimento do access token
+AUTH_MARGEM_RENOVACAO = int(os.getenv("AUTH_MARGEM_RENOVACAO_S", "300"))
+
+# Sessão sem uso há mais que isso não é renovada em segundo plano (renova no próximo uso)
+AUTH_MAX_OCIOSIDADE = int(os.getenv("AUTH_MAX_OCIOSIDADE_S", "3600"))
+
+# Validade mínima para usar o token atual sem esperar a renovação
+AUTH_VALIDADE_MINIMA = 30
+
+# Espera antes de tentar de novo uma renovação que falhou (e limite de espera por ela)
+AUTH_NOVA_TENTATIVA = 30
+
+_executor_renovacao = ThreadPoolExecutor(max_workers=2, thread_name_prefix="auth")
+
+class _Agendador:
+    """Uma thread para todas as sessões: dispara cada renovação no horário marcado"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._fila = []  # heap de (quando, seq, weakref da sessão, geração dos tokens)
+        self._seq = itertools.count()
+        self._thread = None
+
+    def agendar(self, quando: float, sessao, geracao: int):
+        with self._cond:
+            # Referência fraca: uma sessão descartada pelo Streamlit não fica viva na fila
+            heapq.heappush(self._fila, (quando, next(self._seq), weakref.ref(sessao), geracao))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="auth-agendador", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._fila or self._fila[0][0] > time.time():
+                    self._cond.wait(self._fila[0][0] - time.time() if self._fila else None)
+                _, _, ref, geracao = heapq.heappop(self._fila)
+            sessao = ref()
+            if sessao is not None:
+                sessao._no_horario(geracao)
+
+_agendador = _Agendador()
+
+class SessaoAuth:
+    """Tokens de uma sessão do Streamlit, renovados antes de vencer"""
+
+    def __init__(self, access_token: str, refresh_token: str):
+        self._lock = threading.Lock()
+        self._renovacao = None  # Future da renovação em andamento
+        self._falhou_em = None
+        self._geracoes = itertools.count(1)
+        self.renovacoes = 0
+        self.ultimo_uso = time.time()
+        with self._lock:
+            self._definir(access_token, refresh_token)
+
+    def _definir(self, access_token: str, refresh_token: str):
+        # Com o lock: novos tokens e nova renovação agendada (as agendadas antes perdem a vez)
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expira_em = _expiracao_token(access_token)
+        self.geracao = next(self._geracoes)
+        # Tokens de vida curta: margens proporcionais, para não renovar a cada uso
+        vida = max(self.expira_em - time.time(), 0)
+        self._margem = min(AUTH_MARGEM_RENOVACAO, vida / 2)
+        self._validade_minima = min(AUTH_VALIDADE_MINIMA, vida / 4)
+        _agendador.agendar(self.expira_em - self._margem, self, self.geracao)
+
+    def _no_horario(self, geracao: int):
+        # Disparo do agendador: só a geração atual, e só se a sessão está sendo usada
+        if geracao != self.geracao or time.time() - self.ultimo_uso > AUTH_MAX_OCIOSIDADE:
+            return
+        self.renovar()
+
+    def renovar(self):
+        """Future da renovação; chamadas simultâneas recebem a mesma"""
+        with self._lock:
+            if self._renovacao is None:
+                self._renovacao = _executor_renovacao.submit(self._renovar, self.refresh_token, self.geracao)
+            return self._renovacao
+
+    def _renovar(self, refresh_token: str, geracao: int):
+        try:
+            res = novo_cliente_login().auth.refresh_session(refresh_token)
+        except Exception as ex:
+            logger.warning("Falha ao renovar o token da sessão: %s", ex)
+            with self._lock:
+                self._renovacao = None
+                self._falhou_em = time.time()
+                if self.geracao == geracao and self.expira_em > time.time() + AUTH_NOVA_TENTATIVA:
+                    _agendador.agendar(time.time() + AUTH_NOVA_TENTATIVA, self, geracao)
+            raise
+        with self._lock:
+            self._renovacao = None
+            self._falhou_em = None
+            # Encerrada (logout) enquanto renovava: os tokens novos não são usados
+            if self.geracao == geracao:
+                registrar_token_verificado(res.session.access_token)
+                self._definir(res.session.access_token, res.session.refresh_token)
+                self.renovacoes += 1
+
+    def token(self) -> str:
+        """Access token para usar agora: renova antes, se estiver perto de vencer"""
+        self.ultimo_uso = agora = time.time()
+        restante = self.expira_em - agora
+        if restante > self._margem:
+            return self.access_token
+        if restante > self._validade_minima:
+            # Ainda vale: renova em segundo plano (sem insistir logo após uma falha)
+            if self._falhou_em is None or agora - self._falhou_em > AUTH_NOVA_TENTATIVA:
+                self.renovar()
+            return self.access_token
+        try:
+            self.renovar().result(timeout=AUTH_NOVA_TENTATIVA)
+        except Exception:
+            # Sem renovação, segue com o token atual: a consulta mostra o erro do servidor
+            pass
+        return self.access_token
+
+    def encerrar(self):
+        """Logout: cancela as renovações agendadas e tira o cliente do token do pool"""
+        with self._lock:
+            self.geracao = None
+            token = self.access_token
+        liberar_cliente(token)
+
+class ClienteSessao:
+    """Cliente para uso fora do Streamlit (ex.: relatório em lote): cada consulta sai pelo
+    cliente do pool do token atual do SessaoAuth, então execuções longas não levam 401"""
+
+    def __init__(self, sessao: SessaoAuth):
+        self.sessao = sessao
+
+    def table(self, nome: str):
+        return cliente_para_token(self.sessao.token()).table(nome)
+
+    def __getattr__(self, nome):
+        return getattr(cliente_para_token(self.sessao.token()), nome)
+
+def iniciar_sessao_auth(session) -> SessaoAuth:
+    """Guarda os tokens do login (res.session) na sessão do Streamlit e agenda a renovação"""
+    registrar_token_verificado(session.access_token)
+    sessao = SessaoAuth(session.access_token, session.refresh_token)
+    st.session_state["_auth"] = sessao
+    st.session_state.token = session.access_token
+    st.session_state.refresh_token = session.refresh_token
+    return sessao
+
+def encerrar_sessao_auth():
+    """Logout da sessão do Streamlit"""
+    sessao = st.session_state.pop("_auth", None)
+    if sessao is not None:
+        sessao.encerrar()
+    liberar_cliente(st.session_state.get("token"))
+
+def token_sessao():
+    """Access token atual da sessão do Streamlit (renovado pelo SessaoAuth, quando houver)"""
+    sessao = st.session_state.get("_auth")
+    if sessao is None:
+        return st.session_state.get("token")
+    token = sessao.token()
+    if st.session_state.get("token") != token:
+        st.session_state.token = token
+        st.session_state.refresh_token = sessao.refresh_token
+    return token
+
+def get_auth_client():
+    return cliente_para_token(token_sessao())
+
+def liberar_cliente(token):
+    """Remove do pool o cliente de um token (logout)"""
+    if not token:
+        return
+    with _pool_lock:
+        _auth_clients.pop(token, None)
+
+def escopo_token(token: str) -> str:
+    """Identifica o que o portador do token pode ler (chave de isolamento dos caches).
+
+    Usuário ou papel só das claims de um token verificado (registrar_token_verificado);
+    qualquer outro token é o seu próprio escopo (hash), antes de o servidor validá-lo.
+    """
+    if not token:
+        return "anon"
+    claims = _claims_verificadas(token) or {}
+    if CACHE_ESCOPO == "papel" and claims.get("role"):
+        return f"papel:{claims['role']}"
+    if claims.get("sub"):
+        return f"usuario:{claims['sub']}"
+    return "token:" + hashlib.sha256(token.encode()).hexdigest()
+
+def escopo_acesso() -> str:
+    """Escopo do usuário da sessão do Streamlit"""
+    return escopo_token(token_sessao())
 
 def get_supabase() -> Client:
     return get_auth_client()
@@ -0,0 +1,9 @@
+import os
+import logging
+
+# A aplicação exige as variáveis do Supabase no import; nos testes elas não são usadas
+os.environ.setdefault("SUPABASE_URL", "http://supabase.invalido")
+os.environ.setdefault("SUPABASE_ANON_KEY", "teste")
+os.environ.setdefault("INSTRUMENTACAO_LOG", "0")
+os.environ.pop("ESPELHO_LOCAL_PATH", None)
+logging.getLogger("streamlit").setLevel(logging.ERROR)
@@ -0,0 +1,60 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from services.instrumentacao import medir, submeter
+from services.supabase_client import novo_http_client
+
+#-------------------- COALESCÊNCIA: uma ida ao servidor por leitura idêntica em andamento
+
+def _esperar(condicao, limite: float = 5.0) -> bool:
+    fim = time.time() + limite
+    while time.time() < fim:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return condicao()
+
+def test_leituras_identicas_em_andamento_saem_uma_vez_por_token():
+    chamadas = []
+    liberar = threading.Event()
+
+    def servidor(request):
+        chamadas.append(request.headers["authorization"])
+        liberar.wait(5)
+        # Ecoa o token: cada resposta mostra de qual requisição ao servidor veio
+        return httpx.Response(200, json={"token": request.headers["authorization"]})
+
+    cliente = novo_http_client(httpx.MockTransport(servidor))
+    transporte = cliente._transport
+    url = "http://supabase.fake/rest/v1/movimentacao?select=orgao&offset=0&limit=10"
+    tokens = ["Bearer a"] * 3 + ["Bearer b"] * 3
+
+    def ler(token):
+        resposta = cliente.get(url, headers={"Authorization": token})
+        return token, resposta.json()["token"], resposta.extensions.get("coalescida", False)
+
+    with medir("teste") as m, ThreadPoolExecutor(max_workers=len(tokens)) as pool:
+        futuros = [submeter(pool, ler, token) for token in tokens]
+        # Libera o servidor só quando todas as seis estão no ar (duas no servidor, quatro esperando)
+        assert _esperar(lambda: sum(v.seguidores for v in list(transporte._em_voo.values())) == 4)
+        liberar.set()
+        resultados = [f.result() for f in futuros]
+
+    assert sorted(chamadas) == ["Bearer a", "Bearer b"]
+    assert all(enviado == recebido for enviado, recebido, _ in resultados)
+    assert sum(coalescida for _, _, coalescida in resultados) == 4
+    assert (m.requisicoes, m.coalescidas) == (6, 4)
+
+    # Terminada a leitura, a próxima igual vai ao servidor de novo (não é cache)
+    cliente.get(url, headers={"Authorization": "Bearer a"})
+    assert len(chamadas) == 3
+
+def test_escritas_nao_sao_coalescidas():
+    chamadas = []
+    cliente = novo_http_client(httpx.MockTransport(lambda r: chamadas.append(r) or httpx.Response(201)))
+    for _ in range(2):
+        cliente.post("http://supabase.fake/rest/v1/movimentacao", json={"orgao": "X"})
+    assert len(chamadas) == 2
@@ -0,0 +1,51 @@
+import json
+import time
+import base64
+
+import pytest
+
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.supabase_fake import SupabaseFake
+from services import supabase_client
+from services.cache import resultados as cache_resultados
+from services.movimentacao import buscar_orgaos, buscar_por_orgao
+
+#-------------------- ESCOPO DOS CACHES
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    cache_resultados.invalidar()
+    yield
+    cache_resultados.invalidar()
+
+def _jwt(**claims) -> str:
+    def parte(d):
+        return base64.urlsafe_b64encode(json.dumps(d).encode()).rstrip(b"=").decode()
+    return f"{parte({'alg': 'HS256'})}.{parte({'exp': time.time() + 3600, **claims})}.assinatura"
+
+def test_claims_sem_verificacao_nao_definem_o_escopo(monkeypatch):
+    monkeypatch.setattr(supabase_client, "CACHE_ESCOPO", "papel")
+    forjado = _jwt(sub="u1", role="admin")
+    assert supabase_client.escopo_token(forjado).startswith("token:")
+
+    valido = _jwt(sub="u2", role="admin")
+    supabase_client.registrar_token_verificado(valido)
+    assert supabase_client.escopo_token(valido) == "papel:admin"
+    assert supabase_client.escopo_token(forjado) != supabase_client.escopo_token(valido)
+
+def test_escopos_nao_compartilham_resultados():
+    # Dois usuários com visões (RLS) diferentes da mesma tabela
+    df = gerar_movimentacao(2, 30, [2024], 3, seed=9)
+    orgao = df["orgao"].iloc[0]
+    visao_b = df[df["membro"] != df["membro"].iloc[0]]
+    cliente_a, cliente_b = SupabaseFake(df), SupabaseFake(visao_b)
+
+    assert len(buscar_por_orgao(cliente_a, "usuario:a", orgao)) == (df["orgao"] == orgao).sum()
+    assert buscar_orgaos(cliente_a, "usuario:a")
+
+    requisicoes = cliente_b.requisicoes
+    resultado_b = buscar_por_orgao(cliente_b, "usuario:b", orgao)
+    assert len(resultado_b) == (visao_b["orgao"] == orgao).sum()
+    assert cliente_b.requisicoes > requisicoes
+    assert len(resultado_b) < (df["orgao"] == orgao).sum()
+    assert len(buscar_por_orgao(cliente_a, "usuario:a", orgao)) == (df["orgao"] == orgao).sum()
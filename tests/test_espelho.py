@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.supabase_fake import SupabaseFake
+from services import espelho
+from services.cache import resultados as cache_resultados
+from services.movimentacao import buscar_por_orgao
+
+#-------------------- ESPELHO: só leitura na consulta, sincronização pelo job
+
+@pytest.fixture
+def supabase(tmp_path, monkeypatch):
+    monkeypatch.setattr(espelho, "ESPELHO_LOCAL_PATH", str(tmp_path / "espelho.db"))
+    monkeypatch.setattr(espelho, "ESPELHO_INTERVALO_VERIFICACAO", 0)
+    cache_resultados.invalidar()
+    yield SupabaseFake(gerar_movimentacao(3, 40, [2023, 2024], 3, seed=2))
+    cache_resultados.invalidar()
+
+def _linhas_2023() -> int:
+    return int(espelho._ler("SELECT COUNT(*) AS n FROM movimentacao WHERE ano = 2023")["n"].iloc[0])
+
+def _excluir_2023(supabase):
+    df = supabase._tabelas["movimentacao"]
+    supabase._tabelas["movimentacao"] = df[df["ano"] != 2023].reset_index(drop=True)
+
+def test_consulta_nao_sincroniza(supabase):
+    # Espelho vazio: a consulta vai ao Supabase e não preenche o espelho
+    orgao = supabase._tabelas["movimentacao"]["orgao"].iloc[0]
+    assert not buscar_por_orgao(supabase, "teste", orgao).empty
+    assert espelho._ler("SELECT 1") is None
+
+    espelho.sincronizar_agendado(supabase)
+    cache_resultados.invalidar()
+    requisicoes = supabase.requisicoes
+    assert not buscar_por_orgao(supabase, "teste", orgao).empty
+    assert supabase.requisicoes == requisicoes
+
+def test_incremental_nao_ve_exclusao_em_ano_anterior(supabase, monkeypatch):
+    monkeypatch.setattr(espelho, "ESPELHO_INTERVALO_SYNC_COMPLETO", 3600)
+    assert espelho.sincronizar_agendado(supabase)[1]  # primeira: completa
+    _excluir_2023(supabase)
+    assert not espelho.sincronizar_agendado(supabase)[1]
+    assert _linhas_2023() > 0
+
+def test_sincronizacao_completa_vencida_refaz_tudo(supabase, monkeypatch):
+    monkeypatch.setattr(espelho, "ESPELHO_INTERVALO_SYNC_COMPLETO", 0)
+    espelho.sincronizar_agendado(supabase)
+    assert _linhas_2023() > 0
+    _excluir_2023(supabase)
+    assert espelho.sincronizar_agendado(supabase)[1]
+    assert _linhas_2023() == 0
+
+def test_espelho_velho_nao_e_usado(supabase, monkeypatch):
+    espelho.sincronizar_agendado(supabase)
+    monkeypatch.setattr(time, "time", lambda: 1e12)
+    assert espelho._ler("SELECT 1") is None
+
+def test_sincronizacao_de_outro_processo_invalida_o_cache(supabase):
+    df = supabase._tabelas["movimentacao"]
+    orgao = df["orgao"].iloc[0]
+    espelho.sincronizar_agendado(supabase)
+    antes = len(buscar_por_orgao(supabase, "teste", orgao, anos=[2024]))
+
+    # O job (outro processo) regrava 2024 sem linhas deste órgão
+    con = espelho._conectar()
+    with con:
+        con.execute("DELETE FROM movimentacao WHERE ano = 2024 AND orgao = ?", (orgao,))
+        agora = time.time() + 1
+        con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('sincronizado_em', ?)", (agora,))
+        con.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('regravado:2024', ?)", (agora,))
+    con.close()
+
+    assert antes > 0
+    assert buscar_por_orgao(supabase, "teste", orgao, anos=[2024]).empty
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from services import exportacao
+from services.cache import SEM_EXPIRACAO, CacheResultados
+
+#-------------------- CACHE DE EXPORTAÇÃO (limite por bytes, por escopo)
+
+def test_cache_de_exportacao_limitado_por_bytes(monkeypatch):
+    df = pd.DataFrame({"membro": [f"MEMBRO {i:05d}" for i in range(2000)]})
+    tamanho = len(exportacao.gerar_csv_consolidado(df, df))
+    # Cabem dois arquivos: o terceiro tira o menos usado
+    cache = CacheResultados(max_bytes=int(2.5 * tamanho), ttl=SEM_EXPIRACAO)
+    monkeypatch.setattr(exportacao, "_cache", cache)
+
+    for versao in ("v1", "v2", "v3"):
+        exportacao.exportar("csv", "usuario:a", "orgao", versao, df, df)
+
+    assert cache.bytes <= cache.max_bytes
+    assert cache.obter("usuario:a", "exportacao", ("csv", "orgao", "v1")) is None
+    assert cache.obter("usuario:a", "exportacao", ("csv", "orgao", "v3")) is not None
+
+def test_arquivo_de_um_escopo_nao_serve_outro(monkeypatch):
+    monkeypatch.setattr(exportacao, "_cache", CacheResultados(ttl=SEM_EXPIRACAO))
+    df_a = pd.DataFrame({"membro": ["A"]})
+    df_b = pd.DataFrame({"membro": ["B"]})
+    # Mesma versão de propósito: só o escopo separa os dois
+    exportacao.exportar("csv", "usuario:a", "orgao", "v", df_a, df_a)
+    assert b"B" in exportacao.exportar("csv", "usuario:b", "orgao", "v", df_b, df_b)
+
+def test_versao_muda_com_a_ordem_das_linhas():
+    # Uma soma dos hashes por linha não distinguiria estes dois
+    df = pd.DataFrame({"membro": ["A", "B", "C"], "mes": ["JANEIRO", "MARÇO", "MAIO"]})
+    invertido = df.iloc[::-1].reset_index(drop=True)
+    assert exportacao.versao_dados(df, df) != exportacao.versao_dados(invertido, df)
+    assert exportacao.versao_dados(df.iloc[:0], df) != exportacao.versao_dados(df, df.iloc[:0])
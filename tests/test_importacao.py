@@ -0,0 +1,6 @@
+from benchmarks.importacao import perfil_login
+
+#-------------------- LOGIN SEM IMPORTAÇÕES PESADAS
+
+def test_login_nao_importa_modulos_pesados():
+    assert perfil_login()["pesados"] == []
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from services.instrumentacao import contar_linhas, instrumentado
+
+#-------------------- CONTAGEM DE LINHAS DAS ETAPAS
+
+def test_contar_linhas_soma_os_dataframes_de_um_dict():
+    tabelas = {"A": pd.DataFrame({"x": range(72)}), "B": pd.DataFrame({"x": range(5)})}
+    assert contar_linhas(tabelas) == 77
+    assert contar_linhas(pd.DataFrame({"x": range(3)})) == 3
+    assert contar_linhas(None) is None
+
+def test_instrumentado_registra_linhas(monkeypatch):
+    registradas = []
+    monkeypatch.setattr("services.instrumentacao._registrar", registradas.append)
+
+    @instrumentado("etapa_teste")
+    def por_orgao():
+        return {"A": pd.DataFrame({"x": range(72)})}
+
+    @instrumentado("etapa_conflitos", linhas=lambda r: len(r["conflitos"]))
+    def conflitos():
+        return {"conflitos": pd.DataFrame({"x": range(4)}), "por_orgao": pd.DataFrame({"x": range(2)})}
+
+    por_orgao()
+    conflitos()
+    assert [(m.etapa, m.linhas) for m in registradas] == [("etapa_teste", 72), ("etapa_conflitos", 4)]
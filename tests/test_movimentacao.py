@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.supabase_fake import SupabaseFake
+from services.cache import particao, resultados as cache_resultados
+from services.movimentacao import ANO_CARENCIA_DIAS, ANO_NULO, ano_fechado, buscar_anos, buscar_por_orgao
+
+#-------------------- TABELA 1: linhas com ano nulo
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    cache_resultados.invalidar()
+    yield
+    cache_resultados.invalidar()
+
+@pytest.fixture
+def dados():
+    df = gerar_movimentacao(3, 40, [2023, 2024], 3, seed=11)
+    df["ano"] = df["ano"].astype("Int64")
+    # Algumas linhas do primeiro órgão sem ano
+    orgao = df["orgao"].iloc[0]
+    nulos = df.index[df["orgao"] == orgao][:5]
+    df.loc[nulos, "ano"] = pd.NA
+    return df, orgao
+
+def test_todos_os_anos_inclui_ano_nulo(dados):
+    df, orgao = dados
+    supabase = SupabaseFake(df)
+    resultado = buscar_por_orgao(supabase, "teste", orgao)
+    assert len(resultado) == (df["orgao"] == orgao).sum()
+    assert resultado["ano"].isna().sum() == 5
+
+def test_filtro_de_ano_exclui_ano_nulo(dados):
+    df, orgao = dados
+    supabase = SupabaseFake(df)
+    resultado = buscar_por_orgao(supabase, "teste", orgao, anos=[2024])
+    assert len(resultado) == ((df["orgao"] == orgao) & (df["ano"] == 2024)).sum()
+    assert resultado["ano"].notna().all()
+
+#-------------------- ANOS FECHADOS
+
+def test_ano_anterior_so_fecha_depois_da_carencia():
+    assert not ano_fechado(2025, date(2025, 12, 31))
+    assert not ano_fechado(2025, date(2026, 1, 15))  # dezembro ainda chegando
+    assert ano_fechado(2025, date(2026, 1, 1) + timedelta(days=ANO_CARENCIA_DIAS))
+
+#-------------------- ANO NOVO DEPOIS DA LISTA DE ANOS EM CACHE
+
+def test_ano_novo_entra_em_todos_os_anos(dados):
+    df, orgao = dados
+    supabase = SupabaseFake(df)
+    assert set(buscar_por_orgao(supabase, "teste", orgao)["ano"].dropna()) == {2023, 2024}
+
+    # Carga de um ano novo; a partição das linhas sem ano (TTL normal) venceu
+    novo = df[df["ano"] == 2024].assign(ano=2025)
+    supabase._tabelas["movimentacao"] = pd.concat([df, novo], ignore_index=True)
+    cache_resultados.invalidar(particao("movimentacao", ANO_NULO))
+
+    resultado = buscar_por_orgao(supabase, "teste", orgao)
+    assert set(resultado["ano"].dropna()) == {2023, 2024, 2025}
+    assert buscar_anos(supabase, "teste") == [2023, 2024, 2025]
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from benchmarks.supabase_fake import SupabaseFake
+from services.multilotacao import COLUNAS_RESUMO, detectar_multilotacao
+
+#-------------------- MULTI-LOTAÇÃO: membro em dois órgãos no mesmo mês
+
+def _linha(ano, mes, orgao, membro):
+    return {"ano": ano, "mes": mes, "orgao": orgao, "cod_orgao": ord(orgao[-1]), "membro": membro,
+            "designacao": "TITULAR", "observacao": None}
+
+def _dados() -> pd.DataFrame:
+    df = pd.DataFrame([
+        # Conflito: o mesmo membro em A e B em janeiro de 2024 (espaços nas pontas não contam)
+        _linha(2024, "JANEIRO", "ÓRGÃO A", "MEMBRO UM"),
+        _linha(2024, " JANEIRO", "ÓRGÃO B", "MEMBRO UM "),
+        _linha(2024, "FEVEREIRO", "ÓRGÃO A", "MEMBRO UM"),
+        # Sem conflito: órgãos diferentes em meses ou anos diferentes
+        _linha(2024, "JANEIRO", "ÓRGÃO A", "MEMBRO DOIS"),
+        _linha(2024, "FEVEREIRO", "ÓRGÃO B", "MEMBRO DOIS"),
+        _linha(2023, "JANEIRO", "ÓRGÃO C", "MEMBRO UM"),
+        _linha(2024, "JANEIRO", "ÓRGÃO A", "VAGO"),
+        _linha(2024, "JANEIRO", "ÓRGÃO B", "VAGO"),
+        # Ano nulo: o mesmo mês em dois órgãos, mas sem saber de que ano
+        _linha(None, "JANEIRO", "ÓRGÃO A", "MEMBRO TRÊS"),
+        _linha(None, "JANEIRO", "ÓRGÃO C", "MEMBRO TRÊS"),
+    ])
+    df["ano"] = df["ano"].astype("Int64")
+    return df
+
+def test_membro_em_dois_orgaos_no_mesmo_mes():
+    # Páginas de 3 linhas: os anos atravessam páginas
+    resultado = detectar_multilotacao(SupabaseFake(_dados(), max_rows=3), tamanho_pagina=3)
+
+    conflitos = resultado["conflitos"]
+    assert sorted(conflitos["orgao"].astype(str)) == ["ÓRGÃO A", "ÓRGÃO B"]
+    assert set(conflitos["ano"].astype(int)) == {2024}
+    assert conflitos["qtd_orgaos"].tolist() == [2, 2]
+
+    por_orgao = resultado["por_orgao"]
+    assert list(por_orgao.columns) == COLUNAS_RESUMO
+    assert por_orgao.to_dict("records") == [
+        {"orgao": "ÓRGÃO A", "registros": 1, "membros": 1, "meses": 1, "outros_orgaos": 1},
+        {"orgao": "ÓRGÃO B", "registros": 1, "membros": 1, "meses": 1, "outros_orgaos": 1},
+    ]
+
+def test_anos_sem_conflito():
+    resultado = detectar_multilotacao(SupabaseFake(_dados()), ano_inicial=2023, ano_final=2023)
+    assert resultado["conflitos"].empty
+    assert resultado["por_orgao"].empty
+    assert list(resultado["por_orgao"].columns) == COLUNAS_RESUMO
@@ -0,0 +1,102 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.supabase_fake import SupabaseFake
+from pages import consulta
+from services.cache import resultados as cache_resultados
+from services.movimentacao import buscar_por_orgao, buscar_por_orgaos
+from services.prefetch import Prefetch
+
+#-------------------- PREFETCH: cancelamento entre páginas e reaproveitamento
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    cache_resultados.invalidar()
+    yield
+    cache_resultados.invalidar()
+
+@pytest.fixture
+def dados():
+    # 120 linhas por órgão: 12 páginas com max-rows = 10
+    df = gerar_movimentacao(2, 40, [2024], 10, seed=5)
+    df["ano"] = df["ano"].astype("Int64")
+    return df
+
+def test_cancelar_para_entre_paginas(dados):
+    fake = SupabaseFake(dados, latencia=0.05, max_rows=10)
+    orgao = dados["orgao"].iloc[0]
+    chegou = threading.Event()
+    segunda = []
+
+    prefetch = Prefetch(
+        ("teste", orgao),
+        [
+            lambda _, cancelado: buscar_por_orgaos(
+                fake, "teste", [orgao], [2024],
+                ao_receber_pagina=lambda df: chegou.set(), cancelado=cancelado,
+            ),
+            lambda tabelas, cancelado: segunda.append(tabelas),
+        ],
+    )
+    assert chegou.wait(5)
+    prefetch.cancelar()
+    prefetch._tarefa.result(timeout=5)
+
+    # Primeira página + as poucas já pedidas na janela, nunca as 12
+    assert fake.requisicoes < 6
+    assert prefetch.resultado(0) is None and prefetch.resultado(1) is None
+    assert segunda == []
+
+    # A carga interrompida não ficou no cache
+    fake.latencia = 0
+    resultado = buscar_por_orgao(fake, "teste", orgao, [2024])
+    assert len(resultado) == (dados["orgao"] == orgao).sum()
+
+@pytest.fixture
+def pagina(monkeypatch, dados):
+    fake = SupabaseFake(dados, max_rows=10)
+    st = SimpleNamespace(session_state={}, rerun=lambda: None)
+    monkeypatch.setattr(consulta, "st", st)
+    monkeypatch.setattr(consulta, "get_supabase", lambda: fake)
+    monkeypatch.setattr(consulta, "escopo_acesso", lambda: "teste")
+    return st, fake
+
+def test_consulta_reaproveita_prefetch(pagina, dados):
+    st, fake = pagina
+    orgaos = tuple(dados["orgao"].unique())
+    st.session_state.update({"orgao_sel_top": list(orgaos), "anos_sel_top": [2024]})
+
+    consulta.iniciar_prefetch()
+    prefetch = st.session_state["_prefetch"]
+    assert prefetch.resultado(1, timeout=5) is not None
+    requisicoes = fake.requisicoes
+
+    consulta.iniciar_consulta(orgaos, (2024,))
+    atual = st.session_state["_consulta"]
+    assert consulta.tabelas_orgaos(atual) is prefetch.resultado(0)
+    assert consulta.tabelas_outros(atual) is prefetch.resultado(1)
+    assert atual["prefetch"] is True
+    assert fake.requisicoes == requisicoes
+
+def test_prefetch_de_outra_selecao_nao_e_usado(pagina, dados):
+    st, _ = pagina
+    orgaos = tuple(dados["orgao"].unique())
+    st.session_state.update({"orgao_sel_top": list(orgaos), "anos_sel_top": [2024]})
+    consulta.iniciar_prefetch()
+    anterior = st.session_state["_prefetch"]
+    anterior.resultado(1, timeout=5)
+
+    # Trocar a seleção cancela o anterior; a consulta com os anos antigos não o reaproveita
+    st.session_state["anos_sel_top"] = []
+    consulta.iniciar_prefetch()
+    assert anterior.cancelado
+    st.session_state["_prefetch"].resultado(1, timeout=5)
+    assert consulta.obter_prefetch(orgaos, (2024,)) is None
+
+    consulta.iniciar_consulta(orgaos, (2024,))
+    atual = st.session_state["_consulta"]
+    consulta.tabelas_orgaos(atual)
+    assert atual["prefetch"] is False
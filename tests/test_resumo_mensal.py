@@ -0,0 +1,37 @@
+import pytest
+
+from benchmarks.dados import gerar_movimentacao
+from benchmarks.supabase_fake import SupabaseFake
+from services.cache import particao, resultados as cache_resultados
+from services.movimentacao import buscar_por_orgao
+from services.resumo_mensal import resumos_da_tabela
+
+#-------------------- RESUMOS DA TABELA 1 (só cache)
+
+@pytest.fixture(autouse=True)
+def _cache_limpo():
+    cache_resultados.invalidar()
+    yield
+    cache_resultados.invalidar()
+
+@pytest.fixture
+def consulta():
+    df = gerar_movimentacao(3, 40, [2023, 2024], 3, seed=5)
+    supabase = SupabaseFake(df)
+    orgao = df["orgao"].iloc[0]
+    return supabase, orgao, buscar_por_orgao(supabase, "teste", orgao)
+
+def test_resumos_saem_das_particoes_da_tabela(consulta):
+    supabase, orgao, tabela = consulta
+    requisicoes = supabase.requisicoes
+    resumos = resumos_da_tabela("teste", orgao, tabela)
+    assert [r["carga"] for r in resumos] == list(tabela.attrs["cargas"])
+    assert sum(int(r["totais"].sum()) for r in resumos) > 0
+    assert supabase.requisicoes == requisicoes
+
+def test_particao_fora_do_cache_nao_busca_de_novo(consulta):
+    supabase, orgao, tabela = consulta
+    cache_resultados.invalidar(particao("movimentacao", 2024))
+    requisicoes = supabase.requisicoes
+    assert resumos_da_tabela("teste", orgao, tabela) is None
+    assert supabase.requisicoes == requisicoes
@@ -0,0 +1,90 @@
+import gc
+import time
+import weakref
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmarks.supabase_fake import SupabaseFake
+from services import supabase_client
+from services.supabase_client import ClienteSessao, SessaoAuth
+
+#-------------------- SESSÃO DE AUTENTICAÇÃO (renovação em segundo plano)
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = SupabaseFake(pd.DataFrame(columns=["orgao"]), validade_token=3600)
+    monkeypatch.setattr(supabase_client, "novo_cliente_login", lambda: fake)
+    return fake
+
+def _login(fake, validade: int = 3600) -> SessaoAuth:
+    fake.auth.validade = validade
+    res = fake.auth.sign_in_with_password({"email": "usuario@teste"})
+    return SessaoAuth(res.session.access_token, res.session.refresh_token)
+
+def _esperar(condicao, limite: float = 5.0) -> bool:
+    fim = time.time() + limite
+    while time.time() < fim:
+        if condicao():
+            return True
+        time.sleep(0.02)
+    return condicao()
+
+def test_renovacoes_simultaneas_viram_uma(fake):
+    sessao = _login(fake)
+    token_antigo = sessao.access_token
+    fake.latencia = 0.2  # a renovação ainda está em andamento quando as outras chegam
+    largada = threading.Barrier(8)
+    futuros = []
+
+    def pedir():
+        largada.wait()
+        futuros.append(sessao.renovar())
+
+    threads = [threading.Thread(target=pedir) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for fut in futuros:
+        fut.result(timeout=5)
+
+    # O refresh token só vale uma vez: uma segunda renovação teria falhado
+    assert len({id(fut) for fut in futuros}) == 1
+    assert fake.auth.renovacoes == 1
+    assert sessao.renovacoes == 1
+    assert sessao.access_token != token_antigo
+
+def test_agendador_renova_antes_de_vencer(fake):
+    sessao = _login(fake, validade=2)
+    token_antigo = sessao.access_token
+    assert _esperar(lambda: sessao.renovacoes >= 1)
+    assert sessao.access_token != token_antigo
+    assert sessao.expira_em > time.time()
+
+def test_encerrar_cancela_renovacao_e_libera_o_cliente(fake):
+    sessao = _login(fake, validade=2)
+    supabase_client.cliente_para_token(sessao.access_token)
+    assert sessao.access_token in supabase_client._auth_clients
+
+    sessao.encerrar()
+    assert sessao.access_token not in supabase_client._auth_clients
+    time.sleep(1.5)  # passa do horário agendado (metade da validade)
+    assert fake.auth.renovacoes == 0
+
+def test_sessao_descartada_nao_fica_viva_no_agendador(fake):
+    ref = weakref.ref(_login(fake))
+    gc.collect()
+    assert ref() is None
+
+def test_cliente_sessao_usa_o_token_atual(fake, monkeypatch):
+    tokens = []
+    monkeypatch.setattr(supabase_client, "cliente_para_token", lambda token: tokens.append(token) or fake)
+    sessao = _login(fake)
+    cliente = ClienteSessao(sessao)
+
+    cliente.table("orgaos_distintos")
+    sessao.renovar().result(timeout=5)
+    cliente.table("orgaos_distintos")
+    assert tokens[0] != tokens[1] == sessao.access_token
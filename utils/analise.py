@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+from utils.helpers import contains_series, is_vago_series, matches_series
+
+#-------------------- ANÁLISES (Auxílio / Designação / VAGO)
+
+CATEGORIAS = ["auxilio", "designacao", "vago"]
+
+def calcular_ano_mes(mes: pd.Series) -> pd.Series:
+    # 'mes' -> 'AAAA-MM' quando parseável; senão mantém o valor original.
+    # O parse roda só nos valores distintos e volta para as linhas pelos códigos
+    codigos, unicos = pd.factorize(mes.astype(object))
+    unicos = pd.Series(unicos, dtype=object)
+    ano_mes = pd.to_datetime(unicos, errors="coerce").dt.to_period("M").astype(str)
+    ano_mes = ano_mes.mask(ano_mes.isna() | ano_mes.isin(["NaT", "nan"]), unicos)
+    # Código -1 (nulo) pega o None do fim
+    valores = np.append(ano_mes.to_numpy(dtype=object), None)
+    return pd.Series(valores[codigos], index=mes.index)
+
+def classificar(df: pd.DataFrame) -> pd.DataFrame:
+    """Máscaras booleanas (uma coluna por categoria) calculadas numa única passada"""
+    vazio = pd.Series("", index=df.index)
+    designacao = df["designacao"] if "designacao" in df.columns else vazio
+    membro = df["membro"] if "membro" in df.columns else vazio
+
+    # Mesma regra de comparação de utils.helpers: ignora espaços, caixa e acentos
+    return pd.DataFrame({
+        "auxilio": contains_series(designacao, "auxílio"),
+        "designacao": matches_series(designacao, "DESIGNAÇÃO"),
+        "vago": is_vago_series(membro),
+    }, index=df.index)
+
+def _resultado_vazio() -> dict:
+    return {
+        "registros": 0,
+        "meses": 0,
+        "membros": 0,
+        "por_mes": pd.DataFrame(columns=["ano_mes", "quantidade"]),
+    }
+
+def _resumo_vazio() -> dict:
+    return {
+        "contagens": pd.DataFrame(columns=CATEGORIAS, dtype="int64"),
+        "totais": pd.Series(0, index=CATEGORIAS, dtype="int64"),
+        "membros": pd.DataFrame({"categoria": pd.Series(dtype=object), "membro": pd.Series(dtype=object)}),
+    }
+
+def resumir(df: pd.DataFrame) -> dict:
+    """Agregados das três análises de um bloco de linhas (ex.: uma partição órgão/ano).
+
+    Retorna {"contagens": quantidade por ano_mes (índice) e categoria (colunas),
+    "totais": registros por categoria, "membros": pares (categoria, membro) distintos}.
+    Resumos de blocos diferentes se somam com combinar_resumos.
+    """
+    if df.empty or "mes" not in df.columns:
+        return _resumo_vazio()
+
+    mascaras = classificar(df)
+    ano_mes = calcular_ano_mes(df["mes"].astype(object))
+
+    membros = _resumo_vazio()["membros"]
+    if "membro" in df.columns:
+        # object, como em _resumo_vazio (a partição pode vir com membro categórico)
+        membro = df["membro"].astype(object)
+        membros = pd.concat(
+            [pd.DataFrame({"categoria": cat, "membro": membro[mascaras[cat]]}) for cat in CATEGORIAS],
+            ignore_index=True,
+        ).dropna().drop_duplicates(ignore_index=True)
+
+    return {
+        # Contagem por mês das três categorias num único groupby
+        "contagens": mascaras.groupby(ano_mes).sum(),
+        "totais": mascaras.sum(),
+        "membros": membros,
+    }
+
+def resumir_por_orgao(df: pd.DataFrame) -> dict:
+    """resumir de cada órgão de um bloco com a coluna orgao, numa passada só: {orgao: resumo}"""
+    if df.empty or "mes" not in df.columns or "orgao" not in df.columns:
+        return {}
+
+    mascaras = classificar(df)
+    ano_mes = calcular_ano_mes(df["mes"].astype(object))
+    orgao = df["orgao"]
+
+    contagens = dict(tuple(mascaras.groupby([orgao, ano_mes], sort=False).sum().groupby(level=0, sort=False)))
+    totais = mascaras.groupby(orgao, sort=False).sum()
+    membros = {}
+    if "membro" in df.columns:
+        pares = pd.concat(
+            [
+                pd.DataFrame({"orgao": orgao[mascaras[cat]], "categoria": cat, "membro": df.loc[mascaras[cat], "membro"]})
+                for cat in CATEGORIAS
+            ],
+            ignore_index=True,
+        ).dropna().drop_duplicates(ignore_index=True)
+        membros = {o: g.drop(columns="orgao").reset_index(drop=True) for o, g in pares.groupby("orgao", sort=False)}
+
+    vazio = _resumo_vazio()
+    return {
+        o: {
+            "contagens": contagens[o].droplevel(0) if o in contagens else vazio["contagens"],
+            "totais": totais.loc[o].rename(None),
+            "membros": membros.get(o, vazio["membros"]),
+        }
+        for o in totais.index
+    }
+
+def combinar_resumos(resumos) -> dict:
+    """Soma resumos de blocos diferentes (anos, páginas) num só"""
+    resumos = list(resumos)
+    if len(resumos) == 1:
+        return resumos[0]
+    vazio = _resumo_vazio()
+    contagens = [r["contagens"] for r in resumos if not r["contagens"].empty]
+    membros = [r["membros"] for r in resumos if not r["membros"].empty]
+    return {
+        "contagens": pd.concat(contagens).groupby(level=0, sort=False).sum() if contagens else vazio["contagens"],
+        "totais": sum((r["totais"] for r in resumos), vazio["totais"]),
+        "membros": (
+            pd.concat(membros, ignore_index=True).drop_duplicates(ignore_index=True)
+            if membros else vazio["membros"]
+        ),
+    }
+
+def _ordem_cronologica(contagens: pd.DataFrame) -> pd.DataFrame:
+    # Ordem cronológica (parse só dos valores distintos de ano_mes)
+    ordem = pd.DataFrame({
+        "ord": pd.to_datetime(contagens.index.to_series(), errors="coerce"),
+        "ano_mes": contagens.index,
+    }, index=contagens.index).sort_values(["ord", "ano_mes"]).index
+    return contagens.loc[ordem]
+
+def analisar_resumos(resumos) -> dict:
+    """Métricas e tabelas por mês das três análises a partir de resumos (ver resumir).
+
+    Retorna {categoria: {"registros", "meses", "membros", "por_mes"}}, onde `por_mes`
+    tem as colunas ano_mes e quantidade, em ordem cronológica quando possível.
+    """
+    resumo = combinar_resumos(resumos)
+    if resumo["contagens"].empty and not resumo["totais"].any():
+        return {cat: _resultado_vazio() for cat in CATEGORIAS}
+
+    contagens = _ordem_cronologica(resumo["contagens"])
+    membros = resumo["membros"]["categoria"].value_counts()
+
+    resultado = {}
+    for cat in CATEGORIAS:
+        qtd = contagens[cat]
+        qtd = qtd[qtd > 0]
+
+        resultado[cat] = {
+            "registros": int(resumo["totais"][cat]),
+            "meses": int(len(qtd)),
+            "membros": int(membros.get(cat, 0)),
+            "por_mes": pd.DataFrame({
+                "ano_mes": qtd.index.to_numpy(),
+                "quantidade": qtd.to_numpy(dtype="int64"),
+            }),
+        }
+    return resultado
+
+def analisar_orgao(df: pd.DataFrame) -> dict:
+    """analisar_resumos de um único bloco de linhas, com 'mes' parseado uma única vez"""
+    return analisar_resumos([resumir(df)])
+
+COLUNAS_PAINEL = ["orgao"] + [f"{cat}_{medida}" for cat in CATEGORIAS for medida in ("registros", "meses", "membros")]
+
+def painel_orgaos(resumos: dict) -> pd.DataFrame:
+    """Uma linha por órgão com registros, meses e membros de cada categoria.
+
+    `resumos` = {orgao: resumo ou lista de resumos (ex.: um por ano)}; tudo é somado em
+    poucos groupby sobre os resumos de todos os órgãos juntos.
+    """
+    lista = [
+        (orgao, r) for orgao, rs in resumos.items()
+        for r in (rs if isinstance(rs, list) else [rs])
+    ]
+    if not lista:
+        return pd.DataFrame(columns=COLUNAS_PAINEL)
+
+    orgaos = [orgao for orgao, _ in lista]
+    totais = pd.DataFrame([r["totais"] for _, r in lista], index=orgaos).groupby(level=0).sum()
+
+    contagens = [(orgao, r["contagens"]) for orgao, r in lista if not r["contagens"].empty]
+    meses = pd.DataFrame(columns=CATEGORIAS)
+    if contagens:
+        meses = (
+            pd.concat([c for _, c in contagens], keys=[o for o, _ in contagens])
+            .groupby(level=[0, 1]).sum().gt(0).groupby(level=0).sum()
+        )
+
+    membros = [(orgao, r["membros"]) for orgao, r in lista if not r["membros"].empty]
+    por_categoria = pd.DataFrame(columns=CATEGORIAS)
+    if membros:
+        por_categoria = (
+            pd.concat([m for _, m in membros], keys=[o for o, _ in membros]).droplevel(1)
+            .reset_index(names="orgao").drop_duplicates()
+            .groupby(["orgao", "categoria"]).size().unstack()
+        )
+
+    painel = pd.DataFrame({"orgao": totais.index}, index=totais.index)
+    for cat in CATEGORIAS:
+        painel[f"{cat}_registros"] = totais[cat]
+        painel[f"{cat}_meses"] = meses[cat] if cat in meses.columns else 0
+        painel[f"{cat}_membros"] = por_categoria[cat] if cat in por_categoria.columns else 0
+    medidas = COLUNAS_PAINEL[1:]
+    painel[medidas] = painel[medidas].fillna(0).astype("int64")
+    return painel[COLUNAS_PAINEL].reset_index(drop=True)
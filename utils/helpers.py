@@ -1,6 +1,66 @@
+import os
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Quantos textos distintos ficam memorizados na forma dobrada (fold_str)
+CACHE_NORMALIZACAO = int(os.getenv("CACHE_NORMALIZACAO", "65536"))
+
 #-------------------- VAGO / NORMALIZAÇÃO
 def is_vago(valor) -> bool:
-    return isinstance(valor, str) and valor.strip().upper() == "VAGO"
+    return isinstance(valor, str) and fold_str(valor) == "vago"
 
 def normalize_str(x):
-    return "" if x is None else str(x).strip()
\ No newline at end of file
+    return "" if x is None else str(x).strip()
+
+@lru_cache(maxsize=CACHE_NORMALIZACAO)
+def _dobrar(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto.strip().casefold())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+def fold_str(x) -> str:
+    """Forma de comparação: sem espaços nas pontas, casefold e sem acentos ("Auxílio " -> "auxilio")"""
+    return "" if x is None else _dobrar(str(x))
+
+#-------------------- VERSÕES VETORIZADAS (Series)
+#
+# A função escalar roda uma vez por valor distinto (as categorias, ou pd.factorize) e o
+# resultado volta para as linhas pelos códigos: membros, meses e designações se repetem
+# muito, então o custo por linha é só um take.
+
+def _por_valor_unico(s: pd.Series, func, nulo, dtype) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codigos, unicos = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codigos, unicos = pd.factorize(s)
+    # Nulos têm código -1, que pega o último valor: o de nulo
+    valores = [func(v) for v in unicos] + [nulo]
+    if dtype == "bool":
+        dados = np.array(valores, dtype=bool)[codigos]
+    else:
+        dados = pd.array(valores, dtype=dtype).take(codigos)
+    return pd.Series(dados, index=s.index, name=s.name)
+
+def normalize_series(s: pd.Series) -> pd.Series:
+    # Mesmo efeito de normalize_str (nulos viram "")
+    return _por_valor_unico(s, normalize_str, "", "str")
+
+def is_vago_series(s: pd.Series) -> pd.Series:
+    # Máscara booleana equivalente a s.apply(is_vago)
+    return _por_valor_unico(s, is_vago, False, "bool")
+
+def matches_series(s: pd.Series, valor: str) -> pd.Series:
+    # Igualdade pela forma dobrada ("DESIGNAÇÃO" casa com " Designacao"); nulo nunca casa
+    alvo = fold_str(valor)
+    return _por_valor_unico(s, lambda v: fold_str(v) == alvo, False, "bool")
+
+def contains_series(s: pd.Series, trecho: str) -> pd.Series:
+    # Contém o trecho pela forma dobrada ("auxílio" acha "AUXILIO TEMPORÁRIO"); nulo nunca contém
+    alvo = fold_str(trecho)
+    return _por_valor_unico(s, lambda v: alvo in fold_str(v), False, "bool")
+
+def normalize_ano_series(s: pd.Series) -> pd.Series:
+    # 'ano' como inteiro comparável entre fontes (int, float com nulos, Int64, texto); nulo vira -1
+    return pd.to_numeric(s, errors="coerce").fillna(-1).astype("int64")
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.helpers import contains_series
+
+#-------------------- TABELA PAGINADA
+#
+# Filtro, ordenação e paginação feitos no servidor: o navegador recebe só a página
+# visível, então o payload e o tempo de desenho não crescem com o total de linhas.
+# A ordem padrão é a do próprio DataFrame (já ordenado por mês/designação); a ordem
+# por coluna usa um índice (argsort) calculado uma vez por coluna e sentido.
+
+LINHAS_POR_PAGINA = int(os.getenv("TABELA_LINHAS_POR_PAGINA", "100"))
+
+OPCOES_LINHAS_POR_PAGINA = sorted({50, 100, 250, 500, LINHAS_POR_PAGINA})
+
+ORDEM_PADRAO = "(ordem da consulta)"
+
+class TabelaPaginada:
+    """Posições das linhas filtradas e ordenadas, com os índices guardados entre reruns"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._ordens = {}     # (coluna, crescente) -> posições ordenadas
+        self._filtro = None   # (texto, máscara)
+
+    def _ordem(self, coluna: str, crescente: bool) -> np.ndarray:
+        if coluna is None:
+            return np.arange(len(self.df))
+        chave = (coluna, crescente)
+        if chave not in self._ordens:
+            # Estável e com nulos no fim nos dois sentidos; categorias ordenadas (mes, designacao)
+            # seguem a ordem das categorias
+            valores = self.df[coluna].reset_index(drop=True)
+            self._ordens[chave] = valores.sort_values(
+                ascending=crescente, kind="stable", na_position="last"
+            ).index.to_numpy()
+        return self._ordens[chave]
+
+    def _mascara(self, texto: str):
+        texto = (texto or "").strip()
+        if not texto:
+            return None
+        if self._filtro is None or self._filtro[0] != texto:
+            # Contém o texto em qualquer coluna (sem diferenciar caixa e acentos)
+            mascara = np.zeros(len(self.df), dtype=bool)
+            for coluna in self.df.columns:
+                mascara |= contains_series(self.df[coluna], texto).to_numpy()
+            self._filtro = (texto, mascara)
+        return self._filtro[1]
+
+    def posicoes(self, texto: str = "", coluna: str = None, crescente: bool = True) -> np.ndarray:
+        """Posições (iloc) das linhas que passam no filtro, na ordem pedida"""
+        ordem = self._ordem(coluna, crescente)
+        mascara = self._mascara(texto)
+        return ordem if mascara is None else ordem[mascara[ordem]]
+
+    def pagina(self, posicoes: np.ndarray, numero: int, linhas: int) -> pd.DataFrame:
+        inicio = (numero - 1) * linhas
+        return self.df.iloc[posicoes[inicio:inicio + linhas]]
+
+def _primeira_pagina(chave: str):
+    # on_change de filtro/ordem/tamanho: a página atual deixa de fazer sentido
+    st.session_state.pop(f"{chave}_pagina", None)
+
+def mostrar_tabela_paginada(tabela: TabelaPaginada, chave: str):
+    """Controles de filtro/ordem/página e a página visível. `chave` prefixa os widgets"""
+    df = tabela.df
+
+    col_filtro, col_ordem, col_sentido, col_linhas = st.columns([3, 2, 1, 1])
+    with col_filtro:
+        texto = st.text_input("Filtrar", key=f"{chave}_filtro", placeholder="Texto em qualquer coluna",
+                              on_change=_primeira_pagina, args=(chave,))
+    with col_ordem:
+        coluna = st.selectbox("Ordenar por", [ORDEM_PADRAO] + list(df.columns), key=f"{chave}_ordem",
+                              on_change=_primeira_pagina, args=(chave,))
+    with col_sentido:
+        sentido = st.selectbox("Sentido", ["Crescente", "Decrescente"], key=f"{chave}_sentido",
+                               disabled=coluna == ORDEM_PADRAO, on_change=_primeira_pagina, args=(chave,))
+    with col_linhas:
+        linhas = st.selectbox(
+            "Linhas", OPCOES_LINHAS_POR_PAGINA,
+            index=OPCOES_LINHAS_POR_PAGINA.index(LINHAS_POR_PAGINA), key=f"{chave}_linhas",
+            on_change=_primeira_pagina, args=(chave,),
+        )
+
+    posicoes = tabela.posicoes(
+        texto,
+        None if coluna == ORDEM_PADRAO else coluna,
+        sentido == "Crescente",
+    )
+    total = len(posicoes)
+    paginas = max(1, -(-total // linhas))
+
+    # Filtro ou tamanho novos podem deixar a página guardada além da última
+    chave_pagina = f"{chave}_pagina"
+    if st.session_state.get(chave_pagina, 1) > paginas:
+        st.session_state[chave_pagina] = paginas
+    numero = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina) if paginas > 1 else 1
+
+    inicio = (numero - 1) * linhas
+    filtradas = f" (filtradas de {len(df)})" if total != len(df) else ""
+    st.caption(f"Linhas {min(inicio + 1, total)}–{min(inicio + linhas, total)} de {total}{filtradas}")
+    st.dataframe(tabela.pagina(posicoes, numero, linhas), use_container_width=True)